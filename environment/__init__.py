@@ -3,7 +3,10 @@ WoW-style MPQ-based environments
 """
 import os
 import re
+import threading
 import mpq
+from .extractcache import ExtractCache
+from .index import BuildIndex, buildIndex
 
 
 class BuildNotFound(Exception):
@@ -57,7 +60,7 @@ class Base(object):
 		"""
 		sre = re.compile(r"^(\d+).direct$")
 		ret = {}
-		for f in os.listdir(self.rawPath):
+		for f in buildIndex.listdir(self.rawPath):
 			# Here we parse each <build>.direct/
 			match = sre.match(os.path.basename(f))
 			if match:
@@ -113,7 +116,7 @@ class Base(object):
 		files = {}
 		path = self.path()
 		sre = re.compile(r"^wow-(\d+)-\w+.mfil")
-		for f in os.listdir(path):
+		for f in buildIndex.listdir(path):
 			match = sre.match(f)
 			if match:
 				fileBuild = int(match.groups()[0])
@@ -132,7 +135,7 @@ class Base(object):
 		# Old-style wow-updates (oldest) first
 		path = self.dataPath()
 		sre = re.compile(r"^wow-update-(\d+).MPQ$")
-		for f in os.listdir(path):
+		for f in buildIndex.listdir(path):
 			match = sre.match(os.path.basename(f))
 			if match:
 				fileBuild = int(match.groups()[0])
@@ -144,7 +147,7 @@ class Base(object):
 		# we have both old-style and new-style, old-style takes priority.
 		path = self.localePath(locale)
 		sre = re.compile(r"^wow-update-%s-(\d+).MPQ$" % (locale))
-		for f in os.listdir(path):
+		for f in buildIndex.listdir(path):
 			match = sre.match(os.path.basename(f))
 			if match:
 				fileBuild = int(match.groups()[0])
@@ -191,14 +194,51 @@ def highestBase():
 	return base
 
 def highestBuild():
-	ret = 0
+	"""
+	Returns the highest build of the default base, memoized until
+	one of the base directories changes (see BuildIndex).
+	"""
 	base = Base.default()
-	for build in base.builds():
-		base.setBuild(build)
-		i = sorted(base.patchFiles("enUS").keys())[-1]
-		if i > ret:
-			ret = i
+	paths = [base.rawPath]
+	for path in base.builds().values():
+		dataPath = os.path.join(base.rawPath, path, "Data")
+		paths.append(dataPath)
+		paths.append(os.path.join(dataPath, "enUS"))
+
+	def highest():
+		ret = 0
+		for build in base.builds():
+			base.setBuild(build)
+			i = sorted(base.patchFiles("enUS").keys())[-1]
+			if i > ret:
+				ret = i
+		return ret
 
+	return buildIndex.memoize(("highestBuild", base.rawPath), paths, highest)
+
+def _mfilBuilds(path):
+	"""
+	Returns the sorted builds of the files listed in the mfil \a path
+	"""
+	from mfil import MFIL2
+	mfil = MFIL2(path)
+	ret = set()
+	for k, d in mfil["file"].items():
+		build = d.get("fileversion", "")
+		if build.isdigit():
+			ret.add(int(build))
+	return sorted(ret)
+
+def _chain(path):
+	"""
+	Returns the lines of the __chain__ file \a path, as lists of builds
+	"""
+	ret = []
+	with open(path, "r") as f:
+		for line in f:
+			line = [int(x) for x in line.strip().split() if x.isdigit()]
+			if line:
+				ret.append(line)
 	return ret
 
 def archivesForFlags(flags):
@@ -292,8 +332,10 @@ class Environment(object):
 	ARCHIVE_EXPANSION4 = 0x4000
 	ARCHIVE_EXPANSION_ALL = ARCHIVE_EXPANSION1 | ARCHIVE_EXPANSION2 | ARCHIVE_EXPANSION3 | ARCHIVE_EXPANSION4
 	ARCHIVE_ALL = 0xfffffffe # Everything except OLDWORLD
+	# Archives which can contain the DBFilesClient files
+	ARCHIVE_DBFILES = ARCHIVE_LOCALE | ARCHIVE_BASE | ARCHIVE_MISC | ARCHIVE_EXPANSION_ALL
 
-	def __init__(self, build, locale="enUS", base=Base.default(), openFlags=ARCHIVE_ALL):
+	def __init__(self, build, locale="enUS", base=Base.default(), openFlags=ARCHIVE_ALL, tablecache=None, extractcache=None, shared=None):
 		base.setBuild(build)
 		self.base = base
 		self.build = build
@@ -302,23 +344,45 @@ class Environment(object):
 			raise LocaleNotFound(locale)
 		self.locale = locale
 
-		patchlist = self.patchList()
+		# The archives are only mounted when a file is opened, see Environment.mpq
+		self.patches = self.patchList()
 		self.archives = {}
-		self.mpq = mpq.MPQFile()
-		for path in archivesForFlags(openFlags):
-			path = os.path.join(self.base.dataPath(), path % {"l": locale})
-			if os.path.exists(path):
-				self.mpq.add_archive(path)
-
-		if build != base.build():
-			for patch in self.patchList():
-				self.mpq.patch(patch)
+		self.openFlags = openFlags
+		self._mpq = None # Mounted MPQFile, see Environment.mpq
 
 		self._cache = {}
+		self._loading = {} # Per-file locks, see dbFile()
+		self.lock = threading.RLock() # Guards the MPQ handles, shared with the opened files
+		self.tablecache = tablecache # Optional wdbc TableCache
+		self.extractcache = extractcache # Optional ExtractCache for the DBFilesClient files
+		self.shared = shared # Optional SharedTables of the build, see pool.py
 
 	def __repr__(self):
 		return "Environment(build=%r, locale=%r, base=%r)" % (self.build, self.locale, self.base)
 
+	@property
+	def mpq(self):
+		"""
+		The MPQFile made of the archives for the environment's openFlags,
+		patched up to its build. Mounted once, on first access: use
+		ARCHIVE_DBFILES as openFlags to only mount the archives which can
+		contain DBFilesClient files.
+		"""
+		with self.lock:
+			if self._mpq is None:
+				ret = mpq.MPQFile()
+				for path in archivesForFlags(self.openFlags):
+					path = os.path.join(self.base.dataPath(), path % {"l": self.locale})
+					if os.path.exists(path):
+						ret.add_archive(path)
+
+				if self.build != self.base.build():
+					for patch in self.patches:
+						ret.patch(patch)
+
+				self._mpq = ret
+			return self._mpq
+
 	def _dbFileName(self, name):
 		# In order to avoid duplicates, we need to standardize the filename
 		name = name.lower()
@@ -343,27 +407,66 @@ class Environment(object):
 		from ..wdbc.dbc import DBCFile
 		from ..wdbc.structures import getstructure
 		from ..wdbc.utils import getfilename
-		handle = self.open(file)
 		name = getfilename(file)
 		structure = getstructure(name)
 		if name in ("item", "item-sparse"):
 			cls = DB2File
 		else:
 			cls = DBCFile
-		return cls.open(handle, build=self.build, structure=structure, environment=self)
+		if self.extractcache is not None:
+			# Extracted files are memory-mapped: only the extraction uses the MPQs
+			handle = self._extracted(file)
+			return cls.open(handle, build=self.build, structure=structure, environment=self, tablecache=self.tablecache)
+		with self.lock: # The MPQ handles can't be used concurrently
+			handle = self.open(file)
+			return cls.open(handle, build=self.build, structure=structure, environment=self, tablecache=self.tablecache)
+
+	def _extracted(self, file):
+		"""
+		Returns a memory-mapping of \a file from the extraction cache,
+		extracting it from the MPQs first if needed.
+		"""
+		from ..wdbc.mapped import MappedFile
+		path = self.extractcache.get(self.build, self.locale, file)
+		if path is None:
+			with self.lock:
+				data = self.open(file).read()
+			path = self.extractcache.put(self.build, self.locale, file, data)
+		# Keep the file name, which the structure and table cache lookups rely on
+		return MappedFile(path, name=file)
 
 	def hasDbFile(self, name):
 		name = self._dbFileName(name)
 		if name in self._cache:
 			return True
+		if self.extractcache is not None and self.extractcache.get(self.build, self.locale, "DBFilesClient/%s" % (name)):
+			return True
 		return "DBFilesClient/%s" % (name) in self.mpq
 
 	def dbFile(self, name):
+		"""
+		Returns the DBFile \a name, opening it on first access, unless
+		another environment of the build shares it (see pool.py).
+		Threads requesting a file being opened wait for it to be
+		opened once.
+		"""
 		name = self._dbFileName(name)
 		if name not in self._cache:
 			if name.endswith(".wdb"):
 				raise NotImplementedError("Cache files are not supported in environments")
-			self._cache[name] = self._dbFileOpen("DBFilesClient/%s" % (name))
+			with self.lock:
+				lock = self._loading.setdefault(name, threading.Lock())
+			with lock:
+				if name not in self._cache:
+					shared = self.shared.get(name) if self.shared is not None else None
+					if shared is None:
+						file = self._dbFileOpen("DBFilesClient/%s" % (name))
+						if self.shared is not None:
+							shared = self.shared.add(name, file)
+					if shared is not None:
+						# Rows of shared tables resolve their relations in this environment
+						file = shared.view(self)
+					self._cache[name] = file
 
 		return self._cache[name]
 
@@ -390,39 +493,25 @@ class Environment(object):
 		# Look for a mfil matching the build
 		mfilPath = self.base.mfilFiles().get(self.build)
 		if mfilPath:
-			from mfil import MFIL2
-			mfil = MFIL2(mfilPath)
 			baseBuild = self.base.build()
-			retBuilds = []
-
-			for k, d in mfil["file"].items():
-				build = d.get("fileversion", "")
-				if not build.isdigit():
-					continue
-				build = int(build)
-
-				if build > baseBuild and build not in retBuilds:
-					retBuilds.append(build)
-
 			ret = []
-			for build in sorted(retBuilds):
-				for f in patches[build]:
-					ret.append(f)
+			for build in buildIndex.readfile("mfil", mfilPath, _mfilBuilds):
+				if build > baseBuild:
+					for f in patches[build]:
+						ret.append(f)
 
 			return ret
 
 		# Look for __chain__ otherwise
 		chainPath = os.path.join(self.base.path(), "__chain__")
 		if os.path.exists(chainPath):
-			with open(chainPath, "r") as f:
-				for line in f:
-					line = [int(x) for x in line.strip().split() if x.isdigit()]
-					if line and line[0] == self.build:
-						for build in line[1:]:
-							for f in patches[build]:
-								ret.append(f)
-
-						return ret
+			for line in buildIndex.readfile("chain", chainPath, _chain):
+				if line[0] == self.build:
+					for build in line[1:]:
+						for f in patches[build]:
+							ret.append(f)
+
+					return ret
 
 		# fallback algorithm
 		for build in builds:
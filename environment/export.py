@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+"""
+Parallel export of the tables of an environment, along with the
+item and spell tooltips.
+
+	from pywow.environment.export import export
+	export("export/", build=-1, locale="enUS")
+
+Tables are split in chunks of at most CHUNK_ROWS rows, which are
+processed by a pool of worker processes. Each worker opens its own
+environments (through wdbc.get()) and sends back the rows of its
+chunks; the chunks are written in table and id order, so the output
+does not depend on the number of workers.
+
+Output files:
+ - <table>.tsv: the column names, then the raw values of every row.
+   Tables with rows that cannot be read are logged and skipped.
+ - item.txt, spell.txt: every tooltip, preceded by its id in brackets
+"""
+
+import csv
+import os
+import os.path
+from multiprocessing import Pool
+
+CHUNK_ROWS = 5000
+
+# Tooltip exports: (model, table of the ids)
+TOOLTIPS = (
+	("item", "Item-sparse.db2"),
+	("spell", "Spell.dbc"),
+)
+
+
+def _encode(value):
+	if isinstance(value, unicode):
+		return value.encode("utf-8")
+	return value
+
+def _tableIds(args):
+	"""
+	Worker: returns the sorted ids and the column names of a table
+	"""
+	name, build, locale = args
+	from ..wdbc import get
+	from ..wdbc.log import log
+	try:
+		f = get(name, build=build, locale=locale)
+		return sorted(f), f.structure.column_names
+	except Exception, e:
+		log.warning("Could not open %s: %s" % (name, e))
+		return None, None
+
+def _tableRows(args):
+	"""
+	Worker: returns the raw values of a chunk of rows of a table,
+	or None if the chunk could not be read
+	"""
+	name, build, locale, ids = args
+	from ..wdbc import get
+	from ..wdbc.log import log
+	ret = []
+	try:
+		f = get(name, build=build, locale=locale)
+		columns = f.structure.column_names
+		for id in ids:
+			row = f[id]
+			ret.append([_encode(row._raw(column)) for column in columns])
+	except Exception, e:
+		log.warning("Could not read %s (rows %i to %i): %s" % (name, ids[0], ids[-1], e))
+		return None
+	return ret
+
+def _tooltips(args):
+	"""
+	Worker: returns (id, plain text tooltip) pairs for a chunk of models
+	"""
+	name, build, locale, ids = args
+	from ..game import items, spells
+	from ..game.tooltips import PlainTextRenderer
+	from ..wdbc.log import log
+	model = {"item": items.Item, "spell": spells.Spell}[name]
+	ret = []
+	for id in ids:
+		try:
+			text = model(id, build=build, locale=locale).tooltip(PlainTextRenderer)
+		except Exception, e:
+			log.warning("Could not render %s %i: %s" % (name, id, e))
+			continue
+		ret.append((id, _encode(text)))
+	return ret
+
+def _chunks(ids):
+	for i in xrange(0, len(ids), CHUNK_ROWS):
+		yield ids[i:i + CHUNK_ROWS]
+
+
+def tables(environment):
+	"""
+	Returns the names of the tables of \a environment that have a structure
+	"""
+	from ..wdbc.structures import StructureLoader
+	ret = []
+	for name in StructureLoader.names():
+		if name.endswith("cache"): # WDB files
+			continue
+		# Structures replace dashes with underscores, eg. item-sparse
+		for candidate in (name, name.replace("_", "-")):
+			if environment.hasDbFile(candidate):
+				ret.append(environment._dbFileName(candidate))
+				break
+	return ret
+
+def _replace(tmp, filename):
+	"""
+	Renames the finished file \a tmp to \a filename, so that readers
+	never see a partial file
+	"""
+	if os.name == "nt" and os.path.exists(filename):
+		os.remove(filename)
+	os.rename(tmp, filename)
+
+def export(path, build=-1, locale="enUS", names=None, tooltips=True, processes=None):
+	"""
+	Exports the tables \a names (every table with a structure by default)
+	of \a build to the directory \a path, followed by the item and spell
+	tooltips if \a tooltips is True. Runs \a processes worker processes
+	(one per CPU by default).
+	"""
+	from . import Environment, highestBuild
+	from ..wdbc.log import log
+	if build == -1:
+		build = highestBuild() # Once, instead of in every worker
+
+	if names is None:
+		names = tables(Environment(build, locale))
+
+	if not os.path.exists(path):
+		os.makedirs(path)
+
+	pool = Pool(processes)
+	try:
+		# First pass: read the ids of every table
+		tasks = []
+		for name, (ids, columns) in zip(names, pool.imap(_tableIds, [(name, build, locale) for name in names])):
+			if ids is None:
+				continue
+			tasks.append((name, ids, columns))
+
+		# Second pass: export the tables chunk by chunk.
+		# imap() returns the chunks in order, whichever worker ran them.
+		chunks = []
+		for name, ids, columns in tasks:
+			for chunk in _chunks(ids):
+				chunks.append((name, build, locale, chunk))
+		results = pool.imap(_tableRows, chunks)
+
+		for name, ids, columns in tasks:
+			# Tables with an unreadable chunk are skipped, without leaving a partial file
+			filename = os.path.join(path, "%s.tsv" % (os.path.splitext(name)[0]))
+			tmp = "%s.tmp" % (filename)
+			failed = False
+			with open(tmp, "wb") as f:
+				writer = csv.writer(f, dialect="excel-tab")
+				writer.writerow(columns)
+				for chunk in _chunks(ids):
+					rows = results.next() # Consume every chunk of the table, to stay in order
+					if rows is None:
+						failed = True
+					elif not failed:
+						writer.writerows(rows)
+			if failed:
+				os.remove(tmp)
+				log.warning("Skipped %s" % (name))
+				continue
+			_replace(tmp, filename)
+			log.info("Exported %s" % (name))
+
+		if not tooltips:
+			return
+
+		for name, table in TOOLTIPS:
+			ids, columns = pool.apply(_tableIds, ((table, build, locale), ))
+			if ids is None:
+				continue
+			chunks = [(name, build, locale, chunk) for chunk in _chunks(ids)]
+			filename = os.path.join(path, "%s.txt" % (name))
+			tmp = "%s.tmp" % (filename)
+			try:
+				with open(tmp, "wb") as f:
+					for results in pool.imap(_tooltips, chunks):
+						for id, text in results:
+							f.write("[%i]\n%s\n\n" % (id, text))
+			except:
+				os.remove(tmp)
+				raise
+			_replace(tmp, filename)
+			log.info("Exported %s tooltips" % (name))
+	finally:
+		pool.close()
+		pool.join()
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+Content-addressed store of the files extracted from MPQs
+"""
+
+import os
+import os.path
+from hashlib import sha1
+
+
+class ExtractCache(object):
+	"""
+	On-disk cache of the fully patched files read by environments.
+	The contents are stored once per sha1 in <path>/objects/<xx>/<sha1>
+	and referenced by <path>/refs/<build>/<locale>/<file>, which holds
+	the sha1 of the file for that build and locale. Cached files are
+	opened straight from the store, without going through the MPQs.
+
+	The default path is $PYWOW_EXTRACT_DIR, or ~/.cache/pywow/extract.
+	"""
+
+	def __init__(self, path=None):
+		self.path = path or os.environ.get("PYWOW_EXTRACT_DIR", os.path.join(os.path.expanduser("~"), ".cache", "pywow", "extract"))
+
+	def __repr__(self):
+		return "%s(%r)" % (self.__class__.__name__, self.path)
+
+	def _write(self, path, data):
+		# Write atomically so that concurrent processes never see partial files
+		directory = os.path.dirname(path)
+		if not os.path.exists(directory):
+			try:
+				os.makedirs(directory)
+			except OSError: # Created by another process
+				pass
+		tmp = "%s.%i.tmp" % (path, os.getpid())
+		with open(tmp, "wb") as f:
+			f.write(data)
+		if os.name == "nt" and os.path.exists(path):
+			os.remove(path)
+		os.rename(tmp, path)
+
+	def objectPath(self, digest):
+		"""
+		Returns the path of the stored contents with the sha1 \a digest
+		"""
+		return os.path.join(self.path, "objects", digest[:2], digest)
+
+	def refPath(self, build, locale, name):
+		"""
+		Returns the path of the reference to \a name for \a build and \a locale
+		"""
+		return os.path.join(self.path, "refs", str(build), locale, *name.lower().split("/"))
+
+	def get(self, build, locale, name):
+		"""
+		Returns the path of the stored contents of \a name for \a build
+		and \a locale, or None if the file has not been extracted.
+		"""
+		try:
+			with open(self.refPath(build, locale, name), "r") as f:
+				digest = f.read().strip()
+		except IOError:
+			return None
+
+		path = self.objectPath(digest)
+		if not os.path.exists(path):
+			return None
+		return path
+
+	def put(self, build, locale, name, data):
+		"""
+		Stores \a data as the contents of \a name for \a build and
+		\a locale, and returns the path of the stored contents.
+		"""
+		digest = sha1(data).hexdigest()
+		path = self.objectPath(digest)
+		if not os.path.exists(path):
+			self._write(path, data)
+		self._write(self.refPath(build, locale, name), digest)
+		return path
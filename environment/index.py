@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""
+In-process index of the build directories
+"""
+
+import json
+import os
+import os.path
+import threading
+
+MANIFEST_VERSION = 1
+
+
+def _str(value):
+	# json returns unicode strings, paths are byte strings
+	if isinstance(value, unicode):
+		return value.encode("utf-8")
+	return value
+
+def mtime(path):
+	"""
+	Returns the modification time of \a path, or None if it does not exist
+	"""
+	try:
+		return os.stat(path).st_mtime
+	except OSError:
+		return None
+
+
+class BuildIndex(object):
+	"""
+	Cache of the directory listings and files read to discover builds
+	(bases, patch MPQs, mfil and __chain__ files), used by Base.
+	Every entry is checked against the modification time of the
+	directory or file it was read from, so the index only costs a
+	stat() per directory once it is filled.
+	Values derived from the listings are memoized the same way (see
+	BuildIndex.memoize()).
+
+	The listings and files can be saved to and loaded from a manifest
+	(see BuildIndex.save() and BuildIndex.load()), to skip the directory
+	scans of new processes. The default index loads the manifest at
+	$PYWOW_BUILD_MANIFEST, if set.
+	"""
+
+	def __init__(self):
+		self._listings = {} # path -> (mtime, entries)
+		self._files = {} # (kind, path) -> (mtime, value)
+		self._results = {} # key -> (mtimes, value)
+		self._lock = threading.Lock()
+
+	def __repr__(self):
+		return "<%s: %i directories, %i files>" % (self.__class__.__name__, len(self._listings), len(self._files))
+
+	def clear(self):
+		with self._lock:
+			self._listings.clear()
+			self._files.clear()
+			self._results.clear()
+
+	def listdir(self, path):
+		"""
+		Returns os.listdir(\a path), read again only if the directory changed
+		"""
+		current = mtime(path)
+		cached = self._listings.get(path)
+		if cached is None or cached[0] != current:
+			cached = (current, os.listdir(path))
+			with self._lock:
+				self._listings[path] = cached
+		return cached[1]
+
+	def readfile(self, kind, path, func):
+		"""
+		Returns func(\a path), called again only if the file changed.
+		\a kind tells apart the values read from a same file.
+		"""
+		current = mtime(path)
+		key = (kind, path)
+		cached = self._files.get(key)
+		if cached is None or cached[0] != current:
+			cached = (current, func(path))
+			with self._lock:
+				self._files[key] = cached
+		return cached[1]
+
+	def memoize(self, key, paths, func):
+		"""
+		Returns func(), called again only if one of \a paths changed
+		"""
+		mtimes = tuple(mtime(path) for path in paths)
+		cached = self._results.get(key)
+		if cached is None or cached[0] != mtimes:
+			cached = (mtimes, func())
+			with self._lock:
+				self._results[key] = cached
+		return cached[1]
+
+	def load(self, path):
+		"""
+		Loads the manifest \a path. Its entries are still checked
+		against the modification times of the directories and files.
+		Returns whether the manifest could be loaded.
+		"""
+		try:
+			with open(path, "r") as f:
+				manifest = json.load(f)
+		except (IOError, ValueError):
+			return False
+
+		if manifest.get("version") != MANIFEST_VERSION:
+			return False
+
+		with self._lock:
+			for dir, (dirmtime, entries) in manifest["listings"].items():
+				self._listings.setdefault(_str(dir), (dirmtime, [_str(entry) for entry in entries]))
+			for kind, file, filemtime, value in manifest["files"]:
+				self._files.setdefault((_str(kind), _str(file)), (filemtime, value))
+		return True
+
+	def save(self, path):
+		"""
+		Writes the listings and files of the index to the manifest \a path
+		"""
+		with self._lock:
+			manifest = {
+				"version": MANIFEST_VERSION,
+				"listings": dict((dir, list(cached)) for dir, cached in self._listings.items()),
+				"files": [[kind, file, filemtime, value] for (kind, file), (filemtime, value) in self._files.items()],
+			}
+
+		tmp = "%s.%i.tmp" % (path, os.getpid())
+		with open(tmp, "w") as f:
+			json.dump(manifest, f)
+		os.rename(tmp, path)
+
+
+buildIndex = BuildIndex()
+if os.environ.get("PYWOW_BUILD_MANIFEST"):
+	buildIndex.load(os.environ["PYWOW_BUILD_MANIFEST"])
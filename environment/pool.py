@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""
+Bounded pool of environments, used by wdbc.get()
+"""
+
+import threading
+from collections import OrderedDict
+from . import Base, Environment, highestBuild
+
+# Default number of environments kept by a pool
+POOL_SIZE = 8
+
+
+def shareable(structure):
+	"""
+	Returns whether a table of \a structure is the same in every locale,
+	ie. it has no strings. Relations are resolved in the environment
+	using the table (see DBFile.view()).
+	"""
+	from ..wdbc.structures import fields
+	for field in structure:
+		if isinstance(field, (fields.StringField, fields.DynamicFieldsBase)):
+			return False
+	return True
+
+
+class SharedTables(dict):
+	"""
+	Tables shared by the environments of a build, in {name: DBFile}
+	format. Only the tables which do not depend on the locale are
+	shared (see shareable()).
+	Shared tables are detached from the environment which opened them:
+	the SharedTables becomes their environment, and only keeps the
+	archives they are read from (none for memory-mapped tables).
+	Environments use their own view of a shared table (see
+	DBFile.view()), released along with them.
+	"""
+
+	def __init__(self, build):
+		super(SharedTables, self).__init__()
+		self.build = build
+		self._mpqs = {} # name -> MPQFile the table is read from
+		self._lock = threading.Lock()
+
+	def __repr__(self):
+		return "<%s for build %i: %i tables>" % (self.__class__.__name__, self.build, len(self))
+
+	def add(self, name, file):
+		"""
+		Shares \a file as \a name if it does not depend on the locale.
+		Returns the shared file, which may have been opened by another
+		environment in the meantime, or None if \a file cannot be shared.
+		"""
+		from ..wdbc.mapped import MappedFile
+		if not shareable(file.structure):
+			return None
+		with self._lock:
+			if name not in self:
+				if not isinstance(file.file, MappedFile):
+					self._mpqs[name] = file.environment.mpq
+				file.environment = self
+				self[name] = file
+			return self[name]
+
+
+class EnvironmentPool(object):
+	"""
+	Keeps the \a maxsize most recently used environments, in
+	(build, locale) order of use. Environments of a same build share
+	their locale-independent tables (see SharedTables), which are
+	released along with the last environment of their build. Evicted
+	environments do not outlive their last use.
+	Extra keyword arguments are passed to Environment (eg. tablecache,
+	extractcache). As pools only open tables, their environments only
+	mount the archives in ARCHIVE_DBFILES unless openFlags is given.
+	"""
+
+	def __init__(self, maxsize=POOL_SIZE, **kwargs):
+		self.maxsize = maxsize
+		kwargs.setdefault("openFlags", Environment.ARCHIVE_DBFILES)
+		self.kwargs = kwargs
+		self._environments = OrderedDict() # (build, locale) -> Environment, least recently used first
+		self._shared = {} # build -> SharedTables
+		self._lock = threading.RLock()
+
+	def __repr__(self):
+		return "<%s: %i/%i environments>" % (self.__class__.__name__, len(self._environments), self.maxsize)
+
+	def _evict(self):
+		environments = self._environments
+		while len(environments) > self.maxsize:
+			(build, locale), environment = environments.popitem(last=False)
+			if not any(k[0] == build for k in environments):
+				del self._shared[build]
+
+	def clear(self):
+		with self._lock:
+			self._environments.clear()
+			self._shared.clear()
+
+	def environment(self, build, locale="enUS"):
+		"""
+		Returns the environment for \a build (-1 for the highest build)
+		and \a locale, creating it if needed.
+		"""
+		if build == -1:
+			build = highestBuild()
+
+		key = (build, locale)
+		with self._lock:
+			environment = self._environments.pop(key, None)
+			if environment is None:
+				if build not in self._shared:
+					self._shared[build] = SharedTables(build)
+				# Every environment needs its own Base, as it holds the build
+				environment = Environment(build, locale, base=Base.default(), shared=self._shared[build], **self.kwargs)
+			self._environments[key] = environment
+			self._evict()
+		return environment
+
+	def get(self, name, build, locale="enUS"):
+		"""
+		Returns the DBFile \a name of \a build and \a locale
+		"""
+		return self.environment(build, locale).dbFile(name)
+
+
+defaultPool = EnvironmentPool()
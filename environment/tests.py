@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+Checks for pywow.environment:
+ - Tables read from an ExtractCache are the same as the tables read
+   directly.
+ - Environments evicted from an EnvironmentPool are released, while
+   the tables shared with the other environments of the build resolve
+   their relations in the environment using them.
+
+	python -m pywow.environment.tests path/to/Spell.dbc [build]
+"""
+
+import gc
+import os
+import os.path
+import shutil
+import sys
+import tempfile
+import weakref
+from struct import pack
+
+BUILD = 12340
+
+
+def checkExtractCache(path, build=BUILD):
+	from pywow import wdbc
+	from pywow.environment import ExtractCache
+	from pywow.wdbc.mapped import MappedFile
+
+	name = "DBFilesClient/%s" % (os.path.basename(path))
+	directory = tempfile.mkdtemp()
+	try:
+		cache = ExtractCache(directory)
+		with open(path, "rb") as f:
+			cache.put(build, "enUS", name, f.read())
+		stored = cache.get(build, "enUS", name)
+
+		expected = wdbc.open(path, build=build)
+		f = wdbc.open(MappedFile(stored, name=name), build=build)
+		assert f.structure.__class__ is expected.structure.__class__, "%s != %s" % (f.structure, expected.structure)
+		assert sorted(f) == sorted(expected), "The ids differ"
+		for id in expected:
+			assert list(f[id]) == list(expected[id]), "Row %i differs" % (id)
+	finally:
+		shutil.rmtree(directory)
+
+	print "%s: OK (%s, %i rows)" % (name, f.structure, len(f))
+
+def checkPoolEviction(path, build=BUILD):
+	"""
+	Opens a table with a relation to Spell in two locales, through a
+	pool of a single environment and an ExtractCache (no MPQ needed)
+	"""
+	from pywow import wdbc
+	from pywow.environment import ExtractCache
+	from pywow.environment.pool import EnvironmentPool
+
+	spells = sorted(wdbc.open(path, build=build))[:10]
+	directory = tempfile.mkdtemp()
+	environ = os.environ.get("MPQ_BASE_DIR")
+	try:
+		# A base with no archives, for environments of build and locales
+		os.environ["MPQ_BASE_DIR"] = os.path.join(directory, "base")
+		cache = ExtractCache(os.path.join(directory, "extract"))
+		data = os.path.join(directory, "base", "%i.direct" % (build), "Data")
+		table = pack("<4s4I", "WDBC", len(spells), 2, 8, 1) + "".join(pack("<2i", id, spell) for id, spell in enumerate(spells, 1)) + "\0"
+		with open(path, "rb") as f:
+			spell = f.read()
+		for locale in ("enUS", "frFR"):
+			os.makedirs(os.path.join(data, locale))
+			open(os.path.join(data, locale, "wow-update-%s-%i.MPQ" % (locale, build)), "wb").close()
+			cache.put(build, locale, "DBFilesClient/Spell.dbc", spell)
+			cache.put(build, locale, "DBFilesClient/SkillLineAbilitySortedSpell.dbc", table)
+
+		pool = EnvironmentPool(maxsize=1, extractcache=cache)
+		environments = []
+		files = []
+		for locale in ("enUS", "frFR"):
+			environment = pool.environment(build, locale)
+			f = environment.dbFile("SkillLineAbilitySortedSpell")
+			assert [f[id].spell._parent.environment for id in f] == [environment] * len(f), "Relations are not resolved in the requesting environment"
+			environments.append(weakref.ref(environment))
+			files.append(f)
+			del environment, f
+
+		assert files[0]._addresses is files[1]._addresses, "The table is not shared"
+		del files
+		gc.collect()
+		assert environments[0]() is None, "The evicted environment is still referenced"
+		assert environments[1]() is not None, "The pooled environment was released"
+	finally:
+		if environ is None:
+			del os.environ["MPQ_BASE_DIR"]
+		else:
+			os.environ["MPQ_BASE_DIR"] = environ
+		shutil.rmtree(directory)
+
+	print "EnvironmentPool eviction: OK (%i rows)" % (len(spells))
+
+def main():
+	path = sys.argv[1]
+	build = len(sys.argv) > 2 and int(sys.argv[2]) or BUILD
+	checkExtractCache(path, build)
+	checkPoolEviction(path, build)
+
+if __name__ == "__main__":
+	main()
@@ -4,8 +4,12 @@ Game module
 Contains model logic for the game
 """
 
+import threading
 from .colors import *
 
+# Model modules, see warmup()
+MODELS = ("classes", "currencies", "enchants", "glyphs", "items", "itemsets", "quests", "skills", "spells", "talents")
+
 
 class Model(object):
 	"""
@@ -24,8 +28,9 @@ class Model(object):
 		if not hasattr(self, "proxy"):
 			raise RuntimeError("%s.proxy needs to be initialized with initProxy(proxy)" % (self.__class__.__name__))
 		self.id = id
-		self.proxy.build = build
-		self.proxy.locale = locale
+		self._build = build
+		self._locale = locale
+		self._bindProxy()
 		try:
 			self.obj = self.proxy.get(id)
 		except KeyError:
@@ -37,13 +42,23 @@ class Model(object):
 
 		if attr != "proxy" and hasattr(self.proxy, attr):
 			func = getattr(self.proxy, attr)
-			return lambda: func(self.obj)
+			def call():
+				self._bindProxy()
+				return func(self.obj)
+			return call
 
 		return super(Model, self).__getattribute__(attr)
 
 	def __repr__(self):
 		return "%s(%i)" % (self.__class__.__name__, self.id)
 
+	def _bindProxy(self):
+		"""
+		Sets the build and locale of the (shared) proxy to the model's
+		"""
+		self.proxy.build = self._build
+		self.proxy.locale = self._locale
+
 	def __str__(self):
 		if hasattr(self, "getName"):
 			return self.getName()
@@ -128,6 +143,53 @@ class TooltipNode(object):
 class WDBCProxy(object):
 	"""
 	Base WDBC Proxy to use with models
+	A proxy is shared by every instance of its model: its build and
+	locale (set by Model._bindProxy()) are local to each thread.
+	The files in \a tables are opened by warmup().
 	"""
+	tables = ()
+
 	def __init__(self, cls):
-		pass
+		self._state = threading.local()
+
+	@property
+	def build(self):
+		return getattr(self._state, "build", -1)
+
+	@build.setter
+	def build(self, value):
+		self._state.build = value
+
+	@property
+	def locale(self):
+		return getattr(self._state, "locale", "enUS")
+
+	@locale.setter
+	def locale(self, value):
+		self._state.locale = value
+
+
+def warmup(build=-1, locale="enUS"):
+	"""
+	Imports every model and opens the files used by their proxies, for
+	\a build and \a locale. Files are otherwise opened the first time
+	they are used: call this to pay that cost upfront, eg. before
+	forking worker processes.
+	"""
+	from importlib import import_module
+	from pywow import wdbc
+	for name in MODELS:
+		import_module(".%s" % (name), __name__)
+
+	models = Model.__subclasses__()
+	while models:
+		model = models.pop()
+		models.extend(model.__subclasses__())
+		proxy = model.__dict__.get("proxy")
+		if proxy is None:
+			continue
+		for value in vars(proxy).values():
+			if isinstance(value, wdbc.LazyFile):
+				value.open(build, locale)
+		for name in getattr(proxy, "tables", ()):
+			wdbc.get(name, build=build, locale=locale)
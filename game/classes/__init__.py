@@ -26,7 +26,7 @@ class ChrClassProxy(object):
 	"""
 	def __init__(self, cls):
 		from pywow import wdbc
-		self.__file = wdbc.get("ChrClasses.dbc", build=-1)
+		self.__file = wdbc.LazyFile("ChrClasses.dbc")
 	
 	def get(self, id):
 		return self.__file[id]
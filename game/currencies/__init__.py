@@ -25,7 +25,7 @@ class CurrencyProxy(object):
 	"""
 	def __init__(self, cls):
 		from pywow import wdbc
-		self.__file = wdbc.get("CurrencyTypes.dbc", build=-1)
+		self.__file = wdbc.LazyFile("CurrencyTypes.dbc")
 
 	def get(self, id):
 		return self.__file[id]
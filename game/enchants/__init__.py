@@ -16,7 +16,7 @@ class EnchantProxy(object):
 	"""
 	def __init__(self, cls):
 		from pywow import wdbc
-		self.__file = wdbc.get("SpellItemEnchantment.dbc", build=-1)
+		self.__file = wdbc.LazyFile("SpellItemEnchantment.dbc")
 	
 	def get(self, id):
 		return self.__file[id]
@@ -52,7 +52,7 @@ class GlyphProxy(object):
 	"""
 	def __init__(self, cls):
 		from pywow import wdbc
-		self.__file = wdbc.get("GlyphProperties.dbc", build=-1)
+		self.__file = wdbc.LazyFile("GlyphProperties.dbc")
 
 	def get(self, id):
 		from ..spells import Spell
@@ -331,6 +331,7 @@ class ItemProxy(WDBCProxy):
 	"""
 	WDBC proxy for items
 	"""
+	tables = ("Item-sparse.db2", "Item.db2")
 
 	def get(self, id):
 		from pywow import wdbc
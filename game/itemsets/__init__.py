@@ -40,7 +40,7 @@ class ItemSetProxy(object):
 	"""
 	def __init__(self, cls):
 		from pywow import wdbc
-		self.__file = wdbc.get("ItemSet.dbc", build=-1)
+		self.__file = wdbc.LazyFile("ItemSet.dbc")
 
 	def get(self, id):
 		return self.__file[id]
@@ -29,7 +29,7 @@ class QuestProxy(object):
 	"""
 	def __init__(self, cls):
 		from pywow import wdbc
-		self.__file = wdbc.get("questcache.wdb", build=-1)
+		self.__file = wdbc.LazyFile("questcache.wdb")
 
 	def get(self, id):
 		return self.__file[id]
@@ -25,8 +25,8 @@ class SkillProxy(object):
 	"""
 	def __init__(self, cls):
 		from pywow import wdbc
-		self.__file = wdbc.get("SkillLine.dbc", build=-1)
-		self.spells = wdbc.get("SkillLineAbility.dbc", build=-1)
+		self.__file = wdbc.LazyFile("SkillLine.dbc")
+		self.spells = wdbc.LazyFile("SkillLineAbility.dbc")
 	
 	def get(self, id):
 		return self.__file[id]
@@ -182,6 +182,7 @@ class SpellProxy(WDBCProxy):
 	"""
 	WDBC proxy for spells
 	"""
+	tables = ("Spell.dbc", )
 
 	def get(self, id):
 		from pywow import wdbc
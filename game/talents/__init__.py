@@ -24,7 +24,7 @@ class TalentProxy(object):
 	"""
 	def __init__(self, cls):
 		from pywow import wdbc
-		self.__file = wdbc.get("Talent.dbc", build=-1)
+		self.__file = wdbc.LazyFile("Talent.dbc")
 
 	def get(self, id):
 		return self.__file[id]
@@ -19,7 +19,7 @@ class TalentTabProxy(object):
 	
 	def __init__(self, cls):
 		from pywow import wdbc
-		self.__file = wdbc.get("TalentTab.dbc", build=-1)
+		self.__file = wdbc.LazyFile("TalentTab.dbc")
 	
 	def get(self, id):
 		return self.__file[id]
@@ -45,9 +45,17 @@ FUNCTIONS = ["ceil", "cond", "eq", "floor", "gte", "gt", "lte", "lt", "max", "mi
 
 SPELL_DURATION_UNTIL_CANCELLED = "until cancelled"
 
-# XXX get rid of these two calls like this
-gtSpellScaling = wdbc.get("gtSpellScaling", build=-1)
-spellDBC = wdbc.get("Spell", build=-1)
+# Opened on first use, see warmup()
+gtSpellScaling = wdbc.LazyFile("gtSpellScaling")
+spellDBC = wdbc.LazyFile("Spell")
+
+def warmup(build=-1, locale="enUS"):
+	"""
+	Opens the tables used by spell strings for \a build and \a locale,
+	instead of on first use
+	"""
+	gtSpellScaling.open(build, locale)
+	spellDBC.open(build, locale)
 
 class VariableNotFound(Exception):
 	"""
@@ -110,8 +110,12 @@ class Map(object):
 	def __build_foreground(self):
 		bg = self.bg
 		# Do a reverse lookup on WorldMapOverlay.dbc
-		lookups = [k for k in self.wmo if self.wmo[k].zone.name.lower() == self.name]
-		for chunk in lookups:
+		zones = wdbc.get("WorldMapArea", build=BUILD)
+		lookups = []
+		for zone in zones:
+			if zones[zone].name.lower() == self.name:
+				lookups.extend(self.wmo.index("zone")[zone])
+		for chunk in sorted(lookups):
 			row = self.wmo[chunk]
 			name, left, top = row.name, row.left, row.top
 			if name:
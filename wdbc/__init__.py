@@ -1,3 +1,5 @@
 # -*- coding: utf-8 -*-
 
-from .utils import fopen as open, get, new
+from .cache import RowCache, LRURowCache
+from .tablecache import TableCache
+from .utils import fopen as open, get, new, LazyFile
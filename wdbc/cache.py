@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""
+Row caches for DBFile
+"""
+
+import sys
+import threading
+from collections import OrderedDict
+
+
+def rowsize(row):
+	"""
+	Returns an estimation of the memory used by \a row, in bytes.
+	Decoded values are counted shallowly: rows resolved by relations
+	belong to the cache of their own file.
+	Values decoded later on are accounted for with RowCache.grow().
+	"""
+	ret = sys.getsizeof(row) + sys.getsizeof(row._values)
+	if row._data is not None: # lazy row, see DBRow._load()
+		ret += len(row._data)
+	for value in list.__iter__(row):
+		ret += sys.getsizeof(value)
+	for value in row._values.itervalues():
+		ret += sys.getsizeof(value)
+	return ret
+
+
+class RowCache(object):
+	"""
+	Unbounded row cache, the default for DBFile.
+	Every parsed row is kept until it is deleted from the file.
+	Lookups through RowCache.get() are counted in RowCache.hits and
+	RowCache.misses.
+	"""
+
+	def __init__(self):
+		self._rows = {}
+		self.hits = 0
+		self.misses = 0
+		self.evictions = 0
+
+	def __repr__(self):
+		return "<%s: %i rows, %i hits, %i misses, %i evictions>" % (self.__class__.__name__, len(self), self.hits, self.misses, self.evictions)
+
+	def __contains__(self, key):
+		return key in self._rows
+
+	def __delitem__(self, key):
+		del self._rows[key]
+
+	def __getitem__(self, key):
+		return self._rows[key]
+
+	def __iter__(self):
+		return iter(self._rows)
+
+	def __len__(self):
+		return len(self._rows)
+
+	def __setitem__(self, key, row):
+		row._key = key # See DBRow._load()
+		self._rows[key] = row
+
+	def get(self, key):
+		"""
+		Returns the cached row \a key, or None if it is not cached.
+		"""
+		row = self._rows.get(key)
+		if row is None:
+			self.misses += 1
+		else:
+			self.hits += 1
+		return row
+
+	def grow(self, key, size):
+		"""
+		Accounts for \a size more bytes used by the cached row \a key,
+		eg. after decoding some of its columns.
+		"""
+		pass
+
+	def keys(self):
+		return self._rows.keys()
+
+	def pin(self, key):
+		"""
+		Prevents the row \a key from being evicted. Used for rows that
+		cannot be parsed again from the file (eg. rows set by the user).
+		"""
+		pass
+
+	def stats(self):
+		return {"rows": len(self), "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+
+class LRURowCache(RowCache):
+	"""
+	Row cache bounded by a number of rows (\a maxrows) and/or by an
+	estimation of their size in bytes (\a maxbytes, see rowsize()),
+	which grows as the columns of the cached rows are decoded.
+	The least recently used rows are evicted first; evicted rows are
+	parsed again from the file the next time they are accessed.
+	Rows modified in place are not protected from eviction: use the
+	default unbounded RowCache when editing a file.
+	The cache can be shared by several threads.
+	"""
+
+	def __init__(self, maxrows=0, maxbytes=0):
+		if not maxrows and not maxbytes:
+			raise ValueError("LRURowCache requires maxrows or maxbytes")
+		super(LRURowCache, self).__init__()
+		self.maxrows = maxrows
+		self.maxbytes = maxbytes
+		self.size = 0 # Estimated size of the evictable rows, in bytes
+		self._order = OrderedDict() # Evictable keys, least recently used first, with their size
+		self._lock = threading.RLock()
+
+	def __delitem__(self, key):
+		with self._lock:
+			super(LRURowCache, self).__delitem__(key)
+			if key in self._order:
+				self.size -= self._order.pop(key)
+
+	def __setitem__(self, key, row):
+		size = self.maxbytes and rowsize(row) or 0
+		with self._lock:
+			if key in self._rows:
+				del self[key]
+			super(LRURowCache, self).__setitem__(key, row)
+			self._order[key] = size
+			self.size += size
+			self._evict()
+
+	def _evict(self):
+		order = self._order
+		# Never evict the row that was just cached
+		while len(order) > 1 and ((self.maxrows and len(self._rows) > self.maxrows) or (self.maxbytes and self.size > self.maxbytes)):
+			key, size = order.popitem(last=False)
+			del self._rows[key]
+			self.size -= size
+			self.evictions += 1
+
+	def grow(self, key, size):
+		if not self.maxbytes:
+			return
+		with self._lock:
+			if key in self._order:
+				self._order[key] += size # Doesn't change the order of the key
+				self.size += size
+				self._evict()
+
+	def get(self, key):
+		with self._lock:
+			row = super(LRURowCache, self).get(key)
+			if row is not None and key in self._order:
+				# Mark as most recently used
+				self._order[key] = self._order.pop(key)
+			return row
+
+	def pin(self, key):
+		with self._lock:
+			if key in self._order:
+				self.size -= self._order.pop(key)
+
+	def stats(self):
+		ret = super(LRURowCache, self).stats()
+		ret["bytes"] = self.size
+		return ret
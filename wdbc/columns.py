@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""
+Columnar (numpy) views of DBC files
+"""
+
+import numpy
+from .structures import fields
+
+
+# struct format characters to numpy dtypes
+DTYPES = {
+	"b": "i1",
+	"B": "u1",
+	"?": "?",
+	"h": "<i2",
+	"H": "<u2",
+	"i": "<i4",
+	"I": "<u4",
+	"l": "<i4",
+	"L": "<u4",
+	"q": "<i8",
+	"Q": "<u8",
+	"f": "<f4",
+	"d": "<f8",
+}
+
+def dtype(structure, layout, reclen):
+	"""
+	Returns a numpy structured dtype for \a structure, from a
+	DBCFile._recordLayout() \a layout and the records' length.
+	String columns are exposed as uint32 stringblock addresses.
+	"""
+	names, formats, offsets = [], [], []
+	for field, (offset, char) in zip(structure, layout):
+		if char in DTYPES:
+			format = DTYPES[char]
+		elif char.endswith("s"): # Fixed-length binary, eg. HashField
+			format = "S%s" % (char[:-1] or 1)
+		else:
+			raise TypeError("Cannot map field %r (%r) to a numpy dtype" % (field, char))
+
+		names.append(field.name)
+		formats.append(format)
+		offsets.append(offset)
+
+	return numpy.dtype({"names": names, "formats": formats, "offsets": offsets, "itemsize": reclen})
+
+
+class DBCColumns(object):
+	"""
+	Read-only columnar view of a DBCFile's records.
+	- Numeric columns are slices of a numpy structured array sharing
+	  its memory with the file's record block (or its mapping).
+	- String columns hold stringblock addresses; they are only decoded
+	  when requested, through DBCColumns.strings().
+	Rows are in file order, not sorted by id.
+	"""
+
+	def __init__(self, file):
+		reclen = file.header.reclen
+		layout = file._recordLayout()
+		if layout and layout[-1][0] + file.structure[-1].size > reclen:
+			raise ValueError("%r is larger than the file's records (%i bytes)" % (file.structure, reclen))
+
+		self.file = file
+		self.dtype = dtype(file.structure, layout, reclen)
+
+		count = file.header.row_count
+		if file._buffer is not None:
+			self.array = numpy.frombuffer(file._buffer, self.dtype, count, file._dataOffset)
+		else:
+			self.array = numpy.frombuffer(file._read(file._dataOffset, count * reclen), self.dtype, count)
+
+		self._stringColumns = set(field.name for field in file.structure if isinstance(field, fields.StringField))
+
+	def __repr__(self):
+		return "%s(%r)" % (self.__class__.__name__, self.file)
+
+	def __contains__(self, name):
+		return name in self.dtype.names
+
+	def __getitem__(self, name):
+		return self.array[name]
+
+	def __iter__(self):
+		return iter(self.dtype.names)
+
+	def __len__(self):
+		return len(self.array)
+
+	@property
+	def column_names(self):
+		return self.dtype.names
+
+	def ids(self):
+		"""
+		Returns the primary key column
+		"""
+		return self.array[self.file.structure.primary_keys[0].name]
+
+	def string(self, name, index):
+		"""
+		Returns the decoded string of column \a name at row \a index
+		"""
+		return self.file._string(int(self.array[name][index]))
+
+	def strings(self, name):
+		"""
+		Lazily decodes the string column \a name, in row order
+		"""
+		if name not in self._stringColumns:
+			raise ValueError("%r is not a string column" % (name))
+		string = self.file._string
+		for address in self.array[name]:
+			yield string(int(address))
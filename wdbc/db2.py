@@ -1,18 +1,21 @@
 # -*- coding: utf-8 -*-
 
+import sys
+from array import array
 from collections import namedtuple
-from struct import unpack
+from cStringIO import StringIO
+from struct import pack, unpack
 from .dbc import DBCFile
 from .log import log
 
 
-SEEK_CUR = 1 # os.SEEK_CUR
-
 class DB2File(DBCFile):
 	"""
 	New DB format introduced in build 12803
 	"""
 
+	_lookup = None # Row index of each id, from lookup_start, see _readHeader()
+
 	def _readHeader(self):
 		self.headerStructure = "<4s7i"
 		data = self.file.read(32)
@@ -36,10 +39,60 @@ class DB2File(DBCFile):
 				stringblocksize += 1
 			self.header = DB2Header(signature, row_count, field_count, reclen, stringblocksize, dbhash, build, timestamp, lookup_start, lookup_end, locale, unk)
 
-			# Skip the index block... we'll have to use it some day..
+			# The index block maps each id in [lookup_start, lookup_end] to
+			# its row index (int32), followed by one uint16 per id we skip.
 			if lookup_start != lookup_end:
-				size = (lookup_end - lookup_start + 1) * 6
-				if size < 0:
-					log.error("lookup size < 0: %i. This file is corrupt. Expect breakage!" % (size))
+				count = lookup_end - lookup_start + 1
+				if count < 0:
+					log.error("lookup size < 0: %i. This file is corrupt. Expect breakage!" % (count * 6))
 				else:
-					self.file.seek(size, SEEK_CUR)
+					data = self.file.read(count * 6)
+					self._lookup = array("i")
+					self._lookup.fromstring(data[:count * 4])
+					if sys.byteorder == "big":
+						self._lookup.byteswap()
+
+	def _readAddresses(self):
+		lookup = self._lookup
+		row_count = self.header.row_count
+		if lookup is None or len(lookup) != self.header.lookup_end - self.header.lookup_start + 1:
+			return super(DB2File, self)._readAddresses()
+
+		# Ids missing from the file have a 0 row index, as does the id of
+		# the first row: only keep the latter, read from the record itself.
+		reclen = self.header.reclen
+		start = self._dataOffset
+		first = self._parse_field(StringIO(self._read(start, reclen)), self.structure[0]) if row_count else None
+		offset = self.header.lookup_start
+		addresses = self._addresses
+		for i, index in enumerate(lookup):
+			if (index or i + offset == first) and 0 <= index < row_count:
+				addresses[i + offset] = (start + index * reclen, reclen)
+
+		if len(addresses) != row_count:
+			log.warning("The index block of %s does not match its %i rows, scanning them" % (self.file.name, row_count))
+			addresses.clear()
+			super(DB2File, self)._readAddresses()
+
+	def headerData(self, ids=(), header=None):
+		"""
+		Returns the packed \a header (the file's header by default)
+		of the file, followed by the index block of \a ids if the file
+		has one.
+		"""
+		if self._lookup is None:
+			return super(DB2File, self).headerData(ids, header)
+
+		start, end = (min(ids), max(ids)) if ids else (0, 0)
+		header = (header or self.header)._replace(lookup_start=start, lookup_end=end)
+		if start == end:
+			# No index block, see _readHeader()
+			return pack(self.headerStructure, *header)
+
+		lookup = array("i", [0]) * (end - start + 1)
+		for index, id in enumerate(ids):
+			lookup[id - start] = index
+		if sys.byteorder == "big":
+			lookup.byteswap()
+
+		return pack(self.headerStructure, *header) + lookup.tostring() + "\0\0" * len(lookup)
@@ -1,16 +1,57 @@
 # -*- coding: utf-8 -*-
 
+import sys
+from array import array
 from collections import namedtuple
-from struct import pack, unpack
+from itertools import izip, repeat
+from struct import Struct, calcsize, pack, unpack
 from .log import log
-from .main import DBFile
-from .structures import fields, StructureNotFound, getstructure, LocalizedStringField, LocalizedField
+from .main import DBFile, DBRow
+from .structures import fields, StructureNotFound, getstructure
 from .utils import getfilename, generate_structure
 
 
 SEEK_CUR = 1 # os.SEEK_CUR
 SEEK_END = 2 # os.SEEK_END
 
+WRITE_CHUNK_ROWS = 4096 # Records packed in memory at once by DBCFile._write()
+
+
+class StringBlock(object):
+	"""
+	DBC stringblock built incrementally, as the rows are written.
+	Each string is only stored once; the empty string is always
+	at address 0.
+	"""
+
+	def __init__(self):
+		self._addresses = {"": 0}
+		self._strings = [""]
+		self.size = 1 # in bytes
+
+	def __len__(self):
+		return len(self._strings)
+
+	def add(self, value):
+		"""
+		Adds \a value to the stringblock if needed, and returns its address.
+		"""
+		if not value:
+			return 0
+		if isinstance(value, unicode):
+			value = value.encode("utf-8")
+		address = self._addresses.get(value)
+		if address is None:
+			address = self._addresses[value] = self.size
+			self._strings.append(value)
+			self.size += len(value) + 1
+		return address
+
+	def write(self, f):
+		f.write("\0".join(self._strings))
+		f.write("\0")
+
+
 class DBCFile(DBFile):
 	"""
 	A DBC file.
@@ -22,6 +63,9 @@ class DBCFile(DBFile):
 	- The stringblock is a non-repetitive block of null-terminated strings.
 	"""
 
+	_struct = None # Precompiled record Struct, see _recordStruct()
+	_strings = None # (stringblock, offset) pair, see _loadStrings()
+
 	def _readHeader(self):
 		self.headerStructure = "<4s4i"
 		data = self.file.read(20)
@@ -29,6 +73,34 @@ class DBCFile(DBFile):
 		self.header = DBCHeader(*unpack(self.headerStructure, data))
 
 	def _readAddresses(self):
+		reclen = self.header.reclen
+		row_count = self.header.row_count
+		start = self._dataOffset
+		char = self._recordLayout()[0][1]
+		size = calcsize("<" + char)
+		data = self._read(start, row_count * reclen)
+
+		if char not in ("i", "I") or array(char).itemsize != size or not reclen or reclen % size or len(data) != row_count * reclen:
+			# Unusual id column or truncated file, scan row by row
+			self.file.seek(start)
+			return self._scanAddresses()
+
+		# Records are fixed-length: read the whole id column in one go
+		# with a strided slice and compute the addresses arithmetically.
+		ids = array(char)
+		ids.fromstring(data)
+		if sys.byteorder == "big":
+			ids.byteswap()
+		ids = ids[::reclen // size]
+		if char == "I": # array("I") yields longs
+			ids = map(int, ids)
+
+		addresses = izip(xrange(start, start + row_count * reclen, reclen), repeat(reclen))
+		self._addresses.update(izip(ids, addresses))
+		if len(self._addresses) != row_count: # Something's wrong here
+			log.warning("Multiple instances of %i rows found in %s" % (row_count - len(self._addresses), self.file.name))
+
+	def _scanAddresses(self):
 		rows = 0
 		field = self.structure[0]
 		row_header_size = field.size
@@ -56,26 +128,15 @@ class DBCFile(DBFile):
 	def setStructure(self, structure):
 		name = getfilename(self.file.name)
 		try:
-			self.structure = getstructure(name, self.build, parent=self)
+			# Localized fields are already expanded in the (shared) structure
+			self.structure = getstructure(name, self.build)
 		except StructureNotFound:
 			self.structure = generate_structure(self)
 
-		# Generate the Localized Fields
-		fieldidx = []
-		for i, field in enumerate(self.structure):
-			if isinstance(field, LocalizedField):
-				fieldidx.append((i, field.name))
-
-		if fieldidx:
-			from copy import copy
-			fields = LocalizedStringField(build=self.build)
-			for i, name in reversed(fieldidx):
-				# Build a copy of the fields
-				toinsert = [copy(field).rename("%s_%s" % (name, field.name)) for field in fields]
-				self.structure[i:i+1] = toinsert
-
 		log.info("Using %s build %i" % (self.structure, self.build))
 
+		self._struct = None
+		self._columnTable = None
 		self.check_integrity()
 
 	def _parse_field(self, data, field, row=None):
@@ -85,50 +146,165 @@ class DBCFile(DBFile):
 
 	def _parse_row(self, id):
 		address, reclen = self._addresses[id]
-		self.file.seek(address)
-		data = self.file.read(reclen) # We also read id and reclen columns
-		row = self.parse_row(data) # assign to DBRow
+		if self._columns():
+			# Columns are decoded on first access
+			row = DBRow(self, record=self._view(address, reclen))
+		else:
+			data = self._read(address, reclen)
+			row = self.parse_row(data) # assign to DBRow
 		self._values[id] = row
+		return row
 
 	def _parse_string(self, data):
 		address, = unpack("<I", data.read(4))
+		return self._string(address)
+
+	def _loadStrings(self):
+		"""
+		Loads the stringblock once per file, along with an
+		address -> string cache.
+		Memory-mapped files use the mapping itself as the stringblock.
+		"""
+		# The cache is set up first, as other threads use it as soon as _strings is set
+		self._stringCache = {}
+		if self._buffer is not None:
+			self._strings = (self._buffer, len(self._buffer) - self.header.stringblocksize)
+		else:
+			with self._lock:
+				# NOTE: Avoid seeking with SEEK_END because of a bug in stormlib 8.04
+				start = self.size() - self.header.stringblocksize
+				f = self.file
+				pos = f.tell()
+				f.seek(start)
+				strings = f.read()
+				f.seek(pos)
+			self._strings = (strings, 0)
+
+	def _setBuffer(self):
+		super(DBCFile, self)._setBuffer()
+		self._strings = None # The stringblock has to be reloaded
+
+	def _string(self, address):
+		"""
+		Returns the string at \a address within the stringblock
+		"""
 		if not address:
 			return ""
 
-		f = self.file
-		pos = f.tell()
+		if self._strings is None:
+			self._loadStrings()
 
-		# NOTE: Avoid seeking with SEEK_END because of a bug in stormlib 8.04
-		# f.seek(-self.header.stringblocksize + address)
-		# address of the string within the string block
-		size = self.size()
-		if address > size:
+		cache = self._stringCache
+		if address in cache:
+			return cache[address]
+
+		block, start = self._strings
+		size = len(block)
+		stringAddress = start + address
+		if stringAddress >= size:
 			#log.warning("File says there is a string at address %i. File is only %i bytes! Corruption?" % (address, size))
 			return ""
 
-		stringAddress = (size - self.header.stringblocksize + address)
-		f.seek(stringAddress)
+		end = block.find("\0", stringAddress)
+		if end == -1:
+			# We reached EOF before the string was finished.
+			log.warning("Unfinished string, premature EOF. File is corrupt.")
+			end = size
 
-		# Read until \0
-		chars = []
-		while True:
-			char = f.read(1)
-			if char == "\0":
-				break
+		cache[address] = ret = block[stringAddress:end]
+		return ret
 
-			if not char:
-				# We reached EOF before the string was finished.
-				log.warning("Unfinished string, premature EOF. File is corrupt.")
-				if not chars:
-					log.warning("No string found at 0x%08x (%i). Corruption?" % (address, address - self.header.stringblocksize))
-					return ""
-				break
+	def _records(self):
+		if self._buffer is not None:
+			# Unpack straight from the mapping
+			return self._buffer, 0
+		start = self._dataOffset
+		return self._read(start, self.header.row_count * self.header.reclen), start
+
+	def _recordLayout(self):
+		"""
+		Returns a list of (offset, char) pairs, one per column, describing
+		where each column lives within a record and how to unpack it.
+		String columns are kept as their address within the stringblock.
+		"""
+		padded = self.build in (11927, 12025)
+		ret = []
+		offset = 0
+		for field in self.structure:
+			if padded and offset % field.size:
+				# See _checkPadding
+				offset += field.size - (offset % field.size)
+
+			if isinstance(field, fields.StringField):
+				ret.append((offset, "I"))
 			else:
-				chars.append(char)
+				ret.append((offset, field.char))
+			offset += field.size
 
-		f.seek(pos)
+		return ret
 
-		return "".join(chars)
+	def _columnLayout(self):
+		layout = self._recordLayout()
+		if layout and layout[-1][0] + self.structure[-1].size > self.header.reclen:
+			return None # The structure doesn't fit in the records
+		return layout
+
+	def _recordStruct(self):
+		"""
+		Returns a precompiled Struct matching a full record of the file.
+		"""
+		if self._struct is None:
+			format = ["<"]
+			position = 0
+			for offset, char in self._recordLayout():
+				if offset > position:
+					format.append("%ix" % (offset - position))
+				format.append(char)
+				position = offset + calcsize("<" + char)
+
+			if position < self.header.reclen:
+				format.append("%ix" % (self.header.reclen - position))
+
+			self._struct = Struct("".join(format))
+
+		return self._struct
+
+	def load_all(self):
+		"""
+		Decode every row of the file in a single pass.
+		The whole record block is read at once and each record is
+		unpacked with the same precompiled Struct.
+		"""
+		record = self._recordStruct()
+		reclen = self.header.reclen
+		if record.size > reclen:
+			# The structure doesn't fit in the records, parse row by row
+			log.warning("%r is larger than the file's records, cannot bulk decode" % (self.structure))
+			for id in self:
+				self[id]
+			return
+
+		strings = [i for i, field in enumerate(self.structure) if isinstance(field, fields.StringField)]
+		data, start = self._records()
+
+		for id, address in self._addresses.items():
+			if id in self._values:
+				continue
+
+			address = address[0] - start
+			values = list(record.unpack_from(data, address))
+			for i in strings:
+				values[i] = self._string(values[i])
+
+			self._values[id] = DBRow(self, columns=values)
+
+	def to_columns(self):
+		"""
+		Returns a columnar view (DBCColumns) of the file's records,
+		backed by a zero-copy numpy structured array. Requires numpy.
+		"""
+		from .columns import DBCColumns
+		return DBCColumns(self)
 
 	def check_integrity(self):
 		reclen = self.header.reclen
@@ -141,40 +317,93 @@ class DBCFile(DBFile):
 		if field_count != total_fields:
 			log.warning("%r does not respect DBC field count. Expected %i, got %i instead." % (self.structure, field_count, total_fields))
 
-	def data(self):
-		ret = []
-		self._stringBlock = []
-		address_lookup = {}
-		address = 1
-		for row in self:
-			row = self[row]
-			row._save()
-			_data = []
-			for field, value in zip(self.structure, row):
-				if isinstance(field, fields.StringField):
-					if not value:
-						_value = 0
-					elif value in address_lookup: # the string is already in the stringblock
-						_value = address_lookup[value]
-					else:
-						_value = address
-						address_lookup[value] = address
-						self._stringBlock.append(value)
-						address += len(value) + 1
-					value = pack("<I", _value)
-
-				else:
-					value = pack("<%s" % (field.char), value)
-
-				_data.append(value)
-			ret.append("".join(_data))
-		return "".join(ret)
-
-	def headerData(self):
-		return pack(self.headerStructure, *self.header)
-
-	def eof(self):
-		return "\0" + ("\0".join(self._stringBlock)) + "\0"
+	def headerData(self, ids=(), header=None):
+		"""
+		Returns the packed \a header (the file's header by default)
+		of the file, whose rows are \a ids
+		"""
+		return pack(self.headerStructure, *(header or self.header))
+
+	def _cleanRecord(self, id, data, start):
+		"""
+		Returns the raw record of row \a id within \a data (see _records())
+		if the row is unmodified, or None. Rows are considered modified
+		once set in the file, loaded, or when any of their columns was
+		decoded (values can be modified in place).
+		"""
+		address = self._addresses[id]
+		if address == -1:
+			return None
+
+		if id in self._values:
+			row = self._values[id]
+			if row._data is None or row._values:
+				return None
+
+		address, reclen = address
+		return buffer(data, address - start, reclen)
+
+	def _write(self, f):
+		"""
+		Streams the rows to \a f, packing the records with the precompiled
+		record Struct in chunks of WRITE_CHUNK_ROWS. The deduplicated
+		stringblock is built along the way and written after the records,
+		then the header is rewritten with the final sizes.
+		Unmodified rows (see _cleanRecord()) are copied from the file as is,
+		only remapping their string addresses to the new stringblock.
+		"""
+		record = self._recordStruct()
+		reclen = record.size
+		strings = StringBlock()
+		columns = [i for i, field in enumerate(self.structure) if isinstance(field, fields.StringField)]
+
+		passthrough = self._columns() and reclen == self.header.reclen
+		if passthrough:
+			data, start = self._records()
+			layout = self._recordLayout()
+			offsets = [layout[i][0] for i in columns]
+			# Reads every string address of a record at once
+			addresses = Struct("<" + "".join("%ixI" % (offset - previous) for offset, previous in zip(offsets, [0] + [k + 4 for k in offsets])))
+			address = Struct("<I")
+			remap = {} # old string address -> new string address
+
+		ids = sorted(self)
+		f.write(self.headerData(ids)) # Rewritten once the stringblock size is known
+
+		chunk = bytearray(reclen * WRITE_CHUNK_ROWS)
+		position = 0
+		for id in ids:
+			raw = self._cleanRecord(id, data, start) if passthrough else None
+			if raw is not None:
+				chunk[position:position + reclen] = raw
+				for offset, old in zip(offsets, addresses.unpack_from(raw)):
+					if not old:
+						continue
+					if old not in remap:
+						remap[old] = strings.add(self._string(old))
+					if remap[old] != old:
+						address.pack_into(chunk, position + offset, remap[old])
+			else:
+				row = self[id]
+				row._save()
+				values = list(row)
+				for i in columns:
+					values[i] = strings.add(values[i])
+				record.pack_into(chunk, position, *values)
+
+			position += reclen
+			if position == len(chunk):
+				f.write(chunk)
+				position = 0
+		f.write(buffer(chunk, 0, position))
+
+		strings.write(f)
+		# self.header still describes the current file, see DBFile.write()
+		header = self.header._replace(row_count=len(ids), field_count=len(self.structure), reclen=reclen, stringblocksize=strings.size)
+		end = f.tell()
+		f.seek(0)
+		f.write(self.headerData(ids, header))
+		f.seek(end)
 
 
 class WCFFile(DBCFile):
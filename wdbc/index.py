@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""
+Column indexes for DBFile
+"""
+
+
+class ColumnIndex(dict):
+	"""
+	Hash index on the raw values of a DBFile column, in
+	{raw value: [ids]} format. Looking up a value that is not
+	in the column returns an empty list.
+	Indexes are kept up to date by DBFile.__setitem__ and
+	DBFile.__delitem__; rows modified in place have to be set
+	again in the file to be reindexed.
+	"""
+
+	def __init__(self, column):
+		super(ColumnIndex, self).__init__()
+		self.column = column
+		self._keys = {} # id -> indexed raw value
+
+	def __missing__(self, value):
+		return []
+
+	def __repr__(self):
+		return "<%s %r: %i values>" % (self.__class__.__name__, self.column, len(self))
+
+	def fill(self, pairs):
+		"""
+		Indexes every (id, value) pair of \a pairs. The ids must not
+		already be indexed.
+		"""
+		keys = self._keys
+		for id, value in pairs:
+			keys[id] = value
+			if value in self:
+				self[value].append(id)
+			else:
+				self[value] = [id]
+
+	def add(self, id, value):
+		if id in self._keys:
+			self.remove(id)
+		self._keys[id] = value
+		if value in self:
+			self[value].append(id)
+		else:
+			self[value] = [id]
+
+	def remove(self, id):
+		if id not in self._keys:
+			return
+		value = self._keys.pop(id)
+		ids = self[value]
+		ids.remove(id)
+		if not ids:
+			del self[value]
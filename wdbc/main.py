@@ -1,33 +1,62 @@
+import os
+import sys
+import threading
+from array import array
+from copy import copy
 from cStringIO import StringIO
-from struct import pack, unpack, error as StructError
+from struct import Struct, pack, unpack, error as StructError
+from .cache import RowCache
+from .index import ColumnIndex
 from .log import log
+from .mapped import MappedFile
+from .query import LOOKUPS, Query, parse_lookup
 from .structures import fields
 
 
+WRITE_BUFFER_SIZE = 1024 * 1024 # Buffer size of the files written by DBFile.write()
+
 class DBFile(object):
 	"""
 	Base class for WDB and DBC files
+
+	Rows can be read from several threads at once. Files backed by a
+	buffer (memory-mapped, see fopen(mmap=True), or loaded from a
+	TableCache) are read without seeking; other files serialize their
+	seek/read pairs on DBFile._lock, shared by the files of an
+	Environment. Lazy rows are decoded without holding that lock.
+	Writing and modifying rows are not thread-safe.
 	"""
 
+	_columnTable = None # Lazy rows decoding table, see _columns()
+
 	@classmethod
-	def open(cls, file, build, structure, environment):
+	def open(cls, file, build, structure, environment, mmap=False, tablecache=None):
 		if isinstance(file, basestring):
-			file = open(file, "rb")
+			file = MappedFile(file) if mmap else open(file, "rb")
 
 		instance = cls(file, build, environment)
 		instance._readHeader()
+		instance._dataOffset = file.tell() # Address of the first row
 		instance.setStructure(structure)
-		instance._rowDynamicFields = 0 # Dynamic fields index, used when parsing a row
-		instance._readAddresses()
+		if tablecache is None:
+			instance._readAddresses()
+		elif not tablecache.load(instance):
+			instance._readAddresses()
+			tablecache.save(instance)
 
 		return instance
 
 	def __init__(self, file=None, build=None, environment=None):
 		self._addresses = {}
-		self._values = {}
+		self._values = RowCache()
+		self._columnIndexes = {}
+		self._reverseIndexes = {}
 		self.file = file
 		self.build = build
 		self.environment = environment
+		self._lock = getattr(environment, "lock", None) or threading.RLock() # Guards the file handle
+		self._rowLock = threading.Lock() # Guards the decoding of lazy rows, see DBRow._load()
+		self._setBuffer()
 
 	def __repr__(self):
 		return "%s(file=%r, build=%r)" % (self.__class__.__name__, self.file, self.build)
@@ -40,10 +69,11 @@ class DBFile(object):
 			keys = sorted(self._addresses.keys())[item]
 			return [self[k] for k in keys]
 
-		if item not in self._values:
-			self._parse_row(item)
+		row = self._values.get(item)
+		if row is None:
+			row = self._parse_row(item)
 
-		return self._values[item]
+		return row
 
 	def __setitem__(self, item, value):
 		if not isinstance(item, int):
@@ -51,7 +81,11 @@ class DBFile(object):
 
 		if isinstance(value, DBRow):
 			self._values[item] = value
+			self._values.pin(item) # The row can't be parsed again from the file
 			self._addresses[item] = -1
+			for index in self._columnIndexes.values():
+				index.add(item, value._raw(index.column))
+			self._reverseIndexes.clear()
 		else:
 			# FIXME technically we should allow DBRow, but this is untested and will need resetting parent
 			raise TypeError("Unsupported type for DBFile.__setitem__: %s" % (type(value)))
@@ -60,6 +94,9 @@ class DBFile(object):
 		if item in self._values:
 			del self._values[item]
 		del self._addresses[item]
+		for index in self._columnIndexes.values():
+			index.remove(item)
+		self._reverseIndexes.clear()
 
 	def __iter__(self):
 		return self._addresses.__iter__()
@@ -72,13 +109,126 @@ class DBFile(object):
 			log.warning("Multiple instances of row %r found in %s" % (id, self.file.name))
 		self._addresses[id] = (address, reclen)
 
+	def _read(self, address, size):
+		"""
+		Returns \a size bytes of the file starting at \a address.
+		Slices the mapping directly for memory-mapped files.
+		"""
+		if self._buffer is not None:
+			return self._buffer[address:address+size]
+		with self._lock:
+			self.file.seek(address)
+			return self.file.read(size)
+
+	def _view(self, address, size):
+		"""
+		Returns a read-only view of \a size bytes of the file starting
+		at \a address. Views on memory-mapped files do not copy the data.
+		"""
+		if self._buffer is not None:
+			return buffer(self._buffer, address, size)
+		return self._read(address, size)
+
+	def _columnLayout(self):
+		"""
+		Returns a list of (offset, char) pairs locating each column within
+		a row, or None if the rows do not have a fixed layout.
+		"""
+		return None
+
+	def _columns(self):
+		"""
+		Returns the column offset table used to decode lazy rows, as a list
+		of (offset, Struct, is_string) tuples, or None if the rows do not
+		have a fixed layout.
+		"""
+		if self._columnTable is None:
+			layout = self._columnLayout()
+			if layout is None:
+				self._columnTable = False
+			else:
+				self._columnTable = [(offset, Struct("<" + char), isinstance(field, fields.StringField)) for field, (offset, char) in zip(self.structure, layout)]
+
+		return self._columnTable or None
+
+	def _parse_column(self, data, index, address=0):
+		"""
+		Decodes column \a index from the raw record \a data of a lazy row,
+		or from the record starting at \a address within \a data.
+		"""
+		offset, column, string = self._columnTable[index]
+		try:
+			ret, = column.unpack_from(data, address + offset)
+		except StructError:
+			log.warning("Field %s could not be parsed properly" % (self.structure[index]))
+			return None
+
+		if string:
+			return self._string(ret)
+		return ret
+
+	def _records(self):
+		"""
+		Returns a (data, address) pair: a buffer holding the records of
+		the file, and the address of that buffer within the file.
+		"""
+		if self._buffer is not None:
+			return self._buffer, 0
+		start = self._dataOffset
+		return self._read(start, self.size() - start), start
+
+	def _rawColumn(self, name):
+		"""
+		Yields (id, raw value) pairs for the column \a name.
+		"""
+		for id, values in self._rawColumns((name, )):
+			yield id, values[0]
+
+	def _rawColumns(self, names):
+		"""
+		Yields (id, [raw values]) pairs for the columns \a names.
+		On fixed-layout files, the columns are read straight from the
+		records without parsing the rows that are not cached.
+		"""
+		if not self._columns():
+			for id in self:
+				row = self[id]
+				yield id, [row._raw(name) for name in names]
+			return
+
+		indexes = [self.structure.index(name) for name in names]
+		data, start = self._records()
+		values = self._values
+		parse = self._parse_column
+		for id, address in self._addresses.items():
+			if id in values: # Cached rows may have been modified
+				row = values[id]
+				yield id, [row._raw(name) for name in names]
+			else:
+				address = address[0] - start
+				yield id, [parse(data, index, address) for index in indexes]
+
+	def _rawValue(self, id, name):
+		"""
+		Returns the raw value of column \a name in row \a id.
+		On fixed-layout files, uncached rows are not parsed.
+		"""
+		if id in self._values or not self._columns():
+			return self[id]._raw(name)
+		address, reclen = self._addresses[id]
+		return self._parse_column(self._view(address, reclen), rowclass(self.structure)._indexes[name])
+
+	def _setBuffer(self):
+		# Memory-mapped files expose the whole file as a buffer
+		if isinstance(self.file, MappedFile):
+			self._buffer = self.file.buffer
+		else:
+			self._buffer = None
+
 	def _parse_field(self, data, field, row=None):
 		"""
 		Parse a single field in stream.
 		"""
-		if field.dyn > self._rowDynamicFields:
-			return None # The column doesn't exist in this row, we set it to None
-
 		ret = None
 		try:
 			if isinstance(field, fields.StringField):
@@ -90,7 +240,6 @@ class DBFile(object):
 
 			elif isinstance(field, fields.DynamicMaster):
 				ret, = unpack("<I", data.read(4))
-				self._rowDynamicFields = ret
 
 			else:
 				ret, = unpack("<%s" % (field.char), data.read(field.size))
@@ -100,6 +249,59 @@ class DBFile(object):
 
 		return ret
 
+	def build_reverse_indexes(self, *columns):
+		"""
+		Builds the reverse indexes (see DBFile.reverse_index()) of \a columns,
+		or of every foreign key of the file if no column is given, in a
+		single pass over the file.
+		"""
+		if not columns:
+			columns = [field.name for field in self.structure if isinstance(field, fields.ForeignKeyBase)]
+
+		indexes = [{} for column in columns]
+		for id, values in self._rawColumns(columns):
+			for index, value in zip(indexes, values):
+				if value in index:
+					index[value].append(id)
+				else:
+					index[value] = array("I", (id, ))
+
+		self._reverseIndexes.update(zip(columns, indexes))
+
+	def create_index(self, column):
+		"""
+		Builds a hash index (ColumnIndex) on the raw values of \a column,
+		in a single pass over the column, and returns it.
+		eg. f.create_index("category")[4] -> [ids of the rows in category 4]
+		"""
+		index = ColumnIndex(column)
+		index.fill(self._rawColumn(column))
+		self._columnIndexes[column] = index
+		return index
+
+	def index(self, column):
+		"""
+		Returns the index on \a column, building it if needed.
+		"""
+		if column not in self._columnIndexes:
+			return self.create_index(column)
+		return self._columnIndexes[column]
+
+	def exclude(self, **lookups):
+		"""
+		Returns a Query of the rows not matching the lookups.
+		See DBFile.filter().
+		"""
+		return Query(self).exclude(**lookups)
+
+	def filter(self, **lookups):
+		"""
+		Returns a Query of the rows matching every django-like lookup, eg.
+		f.filter(category=4, name_enus__icontains="fire", level__gte=80)
+		Lookups on the file's own columns are evaluated on raw values.
+		"""
+		return Query(self).filter(**lookups)
+
 	def supportsSeeking(self):
 		return hasattr(self.file, "seek")
 
@@ -138,6 +340,41 @@ class DBFile(object):
 		"""
 		return [self[id] for id in self]
 
+	def reverse_index(self, column):
+		"""
+		Returns a {raw value: array of ids} index of \a column, used to
+		resolve reverse relations (eg. spell.spelleffect__spell). The
+		index is built from the raw column, without parsing any row.
+		"""
+		if column not in self._reverseIndexes:
+			self.build_reverse_indexes(column)
+		return self._reverseIndexes[column]
+
+	def setRowCache(self, cache):
+		"""
+		Replaces the row cache of the file (RowCache by default) with
+		\a cache, eg. a LRURowCache to bound the memory used by the
+		parsed rows. Rows already parsed are moved to the new cache.
+		"""
+		for id in self._values.keys():
+			cache[id] = self._values[id]
+			if self._addresses.get(id) == -1:
+				cache.pin(id)
+		self._values = cache
+
+	def view(self, environment):
+		"""
+		Returns a copy of the file sharing its data (addresses, records,
+		indexes) but with its own rows, whose relations are resolved in
+		\a environment. Used to share tables between the environments of
+		a build (see environment.pool.SharedTables).
+		"""
+		ret = copy(self)
+		ret.environment = environment
+		ret._values = RowCache()
+		ret._rowLock = threading.Lock()
+		return ret
+
 	def setRow(self, key, **values):
 		self.__setitem__(key, DBRow(self, columns=values))
 
@@ -159,35 +396,129 @@ class DBFile(object):
 	def write(self, filename=""):
 		"""
 		Write the file data on disk. If filename is not given, use currently opened file.
+		The file is streamed (see _write()) to a temporary file, which
+		then atomically replaces the target.
 		"""
 		_filename = filename or self.file.name
+		tmp = "%s.%i.tmp" % (_filename, os.getpid())
+		f = open(tmp, "wb", WRITE_BUFFER_SIZE)
+		try:
+			self._write(f)
+			size = f.tell()
+		except:
+			f.close()
+			os.remove(tmp)
+			raise
+		f.close()
 
-		data = self.header.data() + self.data() + self.eof()
+		if not filename:
+			# Rows still backed by the current file are decoded before
+			# it is released, as it is replaced underneath them.
+			for id in self._values.keys():
+				row = self._values[id]
+				if row._data is not None:
+					row._load()
+			self.file.close()
 
-		f = open(_filename, "wb") # Don't open before calling data() as uncached rows would be empty
-		f.write(data)
-		f.close()
-		log.info("Written %i bytes at %s" % (len(data), f.name))
+		if os.name == "nt" and os.path.exists(_filename):
+			os.remove(_filename) # os.rename() does not replace files on Windows
+		os.rename(tmp, _filename)
+		log.info("Written %i bytes at %s" % (size, _filename))
 
 		if not filename: # Reopen self.file, we modified it
-			# XXX do we need to wipe self._values here?
-			self.file.close()
-			self.file = open(f.name, "rb")
+			self.file = MappedFile(_filename) if isinstance(self.file, MappedFile) else open(_filename, "rb")
+			self._tablecache = None
+			self._setBuffer()
+			self._readHeader()
+			self._dataOffset = self.file.tell()
+			self._addresses = {}
+			self._readAddresses()
+
+	def _write(self, f):
+		"""
+		Writes the whole file to the file object \a f
+		"""
+		raise NotImplementedError
+
+
+_rowclasses = {}
+
+def _column(name):
+	"""
+	Returns a property decoding column \a name on first access
+	"""
+	def fget(self):
+		values = self._values
+		if name in values:
+			return values[name]
+		return self._get_value(name)
+
+	def fset(self, value):
+		# Do not preserve the value in DBRow! Use the save method to save.
+		self._set_value(name, value)
+
+	return property(fget, fset)
+
+def rowclass(structure):
+	"""
+	Returns the DBRow subclass for \a structure.
+	Classes are generated once per resolved layout (structure and
+	column names, which depend on the build) and shared by every file
+	using that layout. They carry a precomputed name -> index map and
+	a property per column.
+	"""
+	cls = getattr(structure, "_rowclass", None)
+	if cls is not None:
+		return cls
+
+	names = tuple(structure.column_names)
+	key = (structure.__class__, names)
+	if key not in _rowclasses:
+		indexes = {}
+		for index, name in enumerate(names):
+			# Like structure.index(), duplicate column names resolve to the first one
+			indexes.setdefault(name, index)
+		attrs = {
+			"__slots__": (),
+			"_indexes": indexes,
+		}
+		for name in names:
+			# Columns named like DBRow attributes stay reachable through _get_value()
+			if not hasattr(DBRow, name):
+				attrs[name] = _column(name)
+
+		_rowclasses[key] = type("%sRow" % (structure.__class__.__name__), (DBRow, ), attrs)
+
+	structure._rowclass = cls = _rowclasses[key]
+	return cls
 
 
 class DBRow(list):
 	"""
 	A database row.
 	Names of the variables of that class should not be used in field names of structures
+
+	Instantiating DBRow returns an instance of the row class generated
+	for the parent's structure (see rowclass()).
+
+	Rows created from a raw \a record are lazy: each column is decoded
+	from the record the first time it is read, and the list itself is
+	only filled (see _load()) when the row is accessed positionally.
 	"""
-	initialized = False
+	# __dict__ is only allocated when a row is given an ad-hoc attribute
+	__slots__ = ("_parent", "_values", "_data", "_key", "__dict__")
+	_indexes = {}
+
+	def __new__(cls, parent, *args, **kwargs):
+		if cls is DBRow:
+			cls = rowclass(parent.structure)
+		return list.__new__(cls)
 
-	def __init__(self, parent, data=None, columns=None, reclen=0):
+	def __init__(self, parent, data=None, columns=None, reclen=0, record=None):
 		self._parent = parent
 		self._values = {} # Columns values storage
-		self.structure = parent.structure
-
-		self.initialized = True # needed for __setattr__
+		self._data = record # Raw record of a lazy row
+		self._key = None # Key of the row in its file's RowCache, set by RowCache
 
 		if columns:
 			if type(columns) == list:
@@ -195,18 +526,22 @@ class DBRow(list):
 
 			elif type(columns) == dict:
 				self._default()
-				_cols = [k.name for k in self.structure]
 				for k in columns:
 					try:
-						self[_cols.index(k)] = columns[k]
+						self[self._index(k)] = columns[k]
 					except ValueError:
 						log.warning("Column %r not found" % (k))
 
 		elif data:
-			dynfields = 0
+			dynfields = 0 # Dynamic fields present in the row, set by its DynamicMaster
 			data = StringIO(data)
 			for field in self.structure:
+				if field.dyn > dynfields:
+					self.append(None) # The column doesn't exist in this row
+					continue
 				_data = parent._parse_field(data, field, self)
+				if isinstance(field, fields.DynamicMaster):
+					dynfields = _data or 0
 				self.append(_data)
 
 			if reclen:
@@ -214,13 +549,54 @@ class DBRow(list):
 				if data.tell() != real_reclen:
 					log.warning("Reclen not respected for row %r. Expected %i, read %i. (%+i)" % (self.id, real_reclen, data.tell(), real_reclen-data.tell()))
 
+	def __contains__(self, value):
+		if self._data is not None:
+			self._load()
+		return list.__contains__(self, value)
+
+	def __eq__(self, other):
+		if self._data is not None:
+			self._load()
+		return list.__eq__(self, other)
+
+	def __ne__(self, other):
+		return not self.__eq__(other)
+
+	def __getitem__(self, index):
+		if self._data is not None:
+			self._load()
+		return list.__getitem__(self, index)
+
+	def __getslice__(self, i, j):
+		if self._data is not None:
+			self._load()
+		return list.__getslice__(self, i, j)
+
+	def __iter__(self):
+		if self._data is not None:
+			self._load()
+		return list.__iter__(self)
+
+	def __len__(self):
+		if self._data is not None:
+			self._load()
+		return list.__len__(self)
+
+	def __nonzero__(self):
+		return self._data is not None or list.__len__(self) > 0
+
+	def __repr__(self):
+		if self._data is not None:
+			self._load()
+		return list.__repr__(self)
+
 	def __dir__(self):
 		result = self.__dict__.keys()
 		result.extend(self.structure.column_names)
 		return result
 
 	def __getattr__(self, attr):
-		if attr in self.structure:
+		if attr in self._indexes:
 			return self._get_value(attr)
 
 		if attr in self.structure._abstractions: # Union abstractions etc
@@ -235,41 +611,59 @@ class DBRow(list):
 	def __int__(self):
 		return self.id
 
-	def __setattr__(self, attr, value):
-		# Do not preserve the value in DBRow! Use the save method to save.
-		if self.initialized and attr in self.structure:
-			self._set_value(attr, value)
-		return super(DBRow, self).__setattr__(attr, value)
-
 	def __setitem__(self, index, value):
 		if not isinstance(index, int):
 			raise TypeError("Expected int instance, got %s instead (%r)" % (type(index), index))
+		if self._data is not None:
+			self._load()
 		list.__setitem__(self, index, value)
 		col = self.structure[index]
 		self._values[col.name] = col.to_python(value, row=self)
 
+	@property
+	def structure(self):
+		return self._parent.structure
 
-	def _get_reverse_relation(self, table, field):
+	def _load(self):
 		"""
-		Return a list of rows matching the reverse relation
+		Decodes every column of a lazy row into the list
+		"""
+		data = self._data
+		if data is None: # Loaded by another thread
+			return
+		# The record is already in memory: decode it without any lock,
+		# then only swap it in if no other thread did it meanwhile
+		parse = self._parent._parse_column
+		values = [parse(data, index) for index in xrange(len(self.structure))]
+		with self._parent._rowLock:
+			if self._data is None:
+				return
+			size = sys.getsizeof(self)
+			list.extend(self, values)
+			self._data = None
+		if self._key is not None:
+			size = sys.getsizeof(self) - size + sum(sys.getsizeof(value) for value in values) - len(data)
+			self._parent._values.grow(self._key, size)
+
+	def _index(self, name):
 		"""
-		if not hasattr(self._parent, "_reverse_relation_cache"):
-			self._parent._reverse_relation_cache = {}
-		cache = self._parent._reverse_relation_cache
+		Returns the index of column 'name'
+		"""
+		try:
+			return self._indexes[name]
+		except KeyError:
+			return self.structure.index(name)
 
-		tfield = table + "__" + field
-		if tfield not in cache:
-			cache[tfield] = {}
-			# First time lookup, let's build the cache
-			table = self._parent.environment.dbFile(table)
-			for row in table:
-				row = table[row]
-				id = row._raw(field)
-				if id not in cache[tfield]:
-					cache[tfield][id] = []
-				cache[tfield][id].append(row)
 
-		return cache[tfield].get(self.id, None)
+	def _get_reverse_relation(self, table, field):
+		"""
+		Return a list of rows matching the reverse relation
+		"""
+		table = self._parent.environment.dbFile(table)
+		ids = table.reverse_index(field).get(self.id)
+		if ids is None:
+			return None
+		return [table[id] for id in ids]
 
 	def _matches(self, **kwargs):
 		for k, v in kwargs.items():
@@ -281,9 +675,7 @@ class DBRow(list):
 		"""
 		Parse a django-like multilevel relationship
 		"""
-		rels = rel.split("__")
-		if "" in rels: # empty string
-			raise ValueError("Invalid relation string")
+		rels, operator = parse_lookup(rel)
 
 		first = rels[0]
 		if not hasattr(self, first):
@@ -295,42 +687,37 @@ class DBRow(list):
 			raise ValueError("Invalid relation string")
 
 		ret = self
-		rels = rels[::-1]
-
-		special = {
-			"contains": lambda x, y: x in y,
-			"exact": lambda x, y: x == y,
-			"icontains": lambda x, y: x.lower() in y.lower(),
-			"iexact": lambda x, y: x.lower() == y.lower(),
-			"gt": lambda x, y: x > y,
-			"gte": lambda x, y: x >= y,
-			"lt": lambda x, y: x < y,
-			"lte": lambda x, y: x <= y,
-		}
+		for attr in rels:
+			ret = getattr(ret, attr)
 
-		while rels:
-			if rels[-1] in special:
-				if len(rels) != 1:
-					# icontains always needs to be the last piece of the relation string
-					raise ValueError("Invalid relation string")
-
-				return special[rels[-1]](value, ret)
-			else:
-				ret = getattr(ret, rels.pop())
+		if operator:
+			return LOOKUPS[operator](ret, value)
 
 		return ret
 
 	def _set_value(self, name, value):
-		index = self.structure.index(name)
+		if self._data is not None:
+			self._load()
+		index = self._index(name)
 		col = self.structure[index]
 		self._values[name] = col.to_python(value, self)
-		self[index] = value
+		list.__setitem__(self, index, value)
 
 	def _get_value(self, name):
 		if name not in self._values:
-			raw_value = self[self.structure.index(name)]
-
-			self._set_value(name, raw_value)
+			size = sys.getsizeof(self._values)
+			data = self._data
+			if data is not None:
+				# Lazy row: only decode that column
+				index = self._index(name)
+				raw_value = self._parent._parse_column(data, index)
+				self._values[name] = self.structure[index].to_python(raw_value, self)
+			else:
+				raw_value = self[self._index(name)]
+				self._set_value(name, raw_value)
+			if self._key is not None:
+				size = sys.getsizeof(self._values) - size + sys.getsizeof(self._values[name])
+				self._parent._values.grow(self._key, size)
 
 		return self._values[name]
 
@@ -338,12 +725,15 @@ class DBRow(list):
 		"""
 		Returns the raw value from field 'name'
 		"""
-		index = self.structure.index(name)
-		return self[index]
+		index = self._index(name)
+		data = self._data
+		if data is not None:
+			return self._parent._parse_column(data, index)
+		return list.__getitem__(self, index)
 
 	def _save(self):
 		for name in self._values:
-			index = self.structure.index(name)
+			index = self._index(name)
 			col = self.structure[index]
 			self[index] = col.from_python(self._values[name])
 
@@ -351,14 +741,14 @@ class DBRow(list):
 		"""
 		Returns the field 'name'
 		"""
-		index = self.structure.index(name)
-		return self.structure[index]
+		return self.structure[self._index(name)]
 
 	def _default(self):
 		"""
 		Change all fields to their default values
 		"""
 		del self[:]
+		self._data = None
 		self._values = {}
 		for col in self.structure:
 			char = col.char
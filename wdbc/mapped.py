@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""
+Memory-mapped file backend
+"""
+
+import mmap
+
+
+class MappedFile(object):
+	"""
+	Read-only memory mapping of a file on disk.
+	Implements the subset of the file interface used by DBFile, and
+	exposes the mapping itself as MappedFile.buffer so that rows and
+	strings can be decoded straight from it without any syscall.
+	The mapping is shared through the OS page cache by every process
+	opening the same file.
+	\a name is the name the file is known as (used to look up its
+	structure), if it differs from its \a path on disk.
+	"""
+
+	def __init__(self, path, name=None):
+		self.path = path
+		self.name = name or path
+		with open(path, "rb") as f:
+			try:
+				self.buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+			except ValueError: # mmap refuses empty files
+				raise IOError("Cannot map empty file %r" % (path))
+
+	def __repr__(self):
+		return "<%s %r>" % (self.__class__.__name__, self.name)
+
+	@property
+	def closed(self):
+		return self.buffer is None
+
+	def close(self):
+		if self.buffer is not None:
+			self.buffer.close()
+			self.buffer = None
+
+	def read(self, size=-1):
+		if size < 0:
+			size = len(self.buffer) - self.buffer.tell()
+		return self.buffer.read(size)
+
+	def seek(self, offset, whence=0):
+		self.buffer.seek(offset, whence)
+
+	def size(self):
+		return len(self.buffer)
+
+	def tell(self):
+		return self.buffer.tell()
@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+"""
+Django-like lookups on DBFile rows
+"""
+
+# Lookup operators, called as operator(column value, lookup value)
+LOOKUPS = {
+	"contains": lambda x, y: y in x,
+	"exact": lambda x, y: x == y,
+	"icontains": lambda x, y: y.lower() in x.lower(),
+	"iexact": lambda x, y: x.lower() == y.lower(),
+	"gt": lambda x, y: x > y,
+	"gte": lambda x, y: x >= y,
+	"in": lambda x, y: x in y,
+	"lt": lambda x, y: x < y,
+	"lte": lambda x, y: x <= y,
+}
+
+# Lookup values that can be compared to raw column values
+RAW_TYPES = (int, long, float, basestring)
+
+_lookups = {}
+def parse_lookup(rel):
+	"""
+	Splits the lookup string \a rel into a (relation, operator) pair,
+	eg. "spell__name__icontains" -> (("spell", "name"), "icontains").
+	The operator is None if the lookup doesn't end with one.
+	Results are memoized.
+	"""
+	if rel not in _lookups:
+		rels = rel.split("__")
+		if "" in rels: # empty string
+			raise ValueError("Invalid relation string")
+
+		operator = None
+		if rels[-1] in LOOKUPS:
+			operator = rels.pop()
+
+		if not rels or any(k in LOOKUPS for k in rels):
+			# The operator always needs to be the last piece of the relation string
+			raise ValueError("Invalid relation string")
+
+		_lookups[rel] = (tuple(rels), operator)
+
+	return _lookups[rel]
+
+
+class Lookup(object):
+	"""
+	A compiled lookup, eg. Lookup(f, "level__gte", 80)
+	Lookups on a column of the file itself compared to a plain value
+	(numbers, strings) are evaluated on the raw column values, without
+	resolving relations or building rows.
+	"""
+
+	def __init__(self, file, rel, value):
+		self.relation, operator = parse_lookup(rel)
+		self.operator = operator or "exact"
+		self.test = LOOKUPS[self.operator]
+		self.value = value
+		self.column = None
+
+		if self.operator == "in":
+			self.value = value = tuple(value)
+			raw = all(isinstance(k, RAW_TYPES) for k in value)
+		else:
+			raw = isinstance(value, RAW_TYPES)
+		if raw and len(self.relation) == 1 and self.relation[0] in file.structure:
+			self.column = self.relation[0]
+
+	def __repr__(self):
+		return "%s(%r, %r)" % (self.__class__.__name__, "__".join(self.relation + (self.operator, )), self.value)
+
+	def match(self, row):
+		try:
+			value = row._query("__".join(self.relation))
+		except AttributeError: # Empty relation along the way
+			return False
+		return self.test(value, self.value)
+
+	def matchRaw(self, value):
+		return self.test(value, self.value)
+
+
+class Query(object):
+	"""
+	Lazy, chainable set of lookups on a DBFile.
+	- Query.filter() keeps the rows matching every given lookup.
+	- Query.exclude() removes the rows matching every given lookup.
+	Equality and "in" lookups on indexed columns (see DBFile.index())
+	only consider the ids found in the index.
+	Matching rows are returned in id order.
+	"""
+
+	def __init__(self, file, groups=()):
+		self.file = file
+		self.groups = groups # (negate, [Lookup, ...]) pairs
+
+	def __repr__(self):
+		return "<%s on %r: %r>" % (self.__class__.__name__, self.file, self.groups)
+
+	def __iter__(self):
+		file = self.file
+		for id in self.ids():
+			yield file[id]
+
+	def __len__(self):
+		return len(self.ids())
+
+	def _candidates(self):
+		"""
+		Returns the set of ids allowed by the indexed lookups, or
+		None if no index can be used.
+		"""
+		ret = None
+		indexes = self.file._columnIndexes
+		for negate, group in self.groups:
+			if negate:
+				continue
+			for lookup in group:
+				if lookup.column not in indexes or lookup.operator not in ("exact", "in"):
+					continue
+				index = indexes[lookup.column]
+				if lookup.operator == "exact":
+					ids = set(index[lookup.value])
+				else:
+					ids = set()
+					for value in lookup.value:
+						ids.update(index[value])
+				ret = ids if ret is None else ret & ids
+
+		return ret
+
+	def _compile(self, lookups, negate):
+		group = [Lookup(self.file, k, v) for k, v in lookups.items()]
+		return Query(self.file, self.groups + ((negate, group), ))
+
+	def count(self):
+		return len(self.ids())
+
+	def exclude(self, **lookups):
+		return self._compile(lookups, True)
+
+	def filter(self, **lookups):
+		return self._compile(lookups, False)
+
+	def ids(self):
+		"""
+		Returns the sorted list of ids matching the query
+		"""
+		file = self.file
+		candidates = self._candidates()
+		if candidates is None:
+			ids = sorted(file)
+			columns = {}
+			def raw(id, column):
+				# Full scan: read each column in a single pass
+				if column not in columns:
+					columns[column] = dict(file._rawColumn(column))
+				return columns[column][id]
+		else:
+			ids = sorted(k for k in candidates if k in file)
+			raw = file._rawValue
+
+		for negate, group in self.groups:
+			ret = []
+			for id in ids:
+				matches = True
+				for lookup in group:
+					if lookup.column:
+						matches = lookup.matchRaw(raw(id, lookup.column))
+					else:
+						matches = lookup.match(file[id])
+					if not matches:
+						break
+				if matches != negate:
+					ret.append(id)
+			ids = ret
+
+		return ids
+
+	def values(self, *columns):
+		"""
+		Returns a list of {column: raw value} dicts for the matching rows,
+		restricted to \a columns if given.
+		"""
+		file = self.file
+		columns = columns or file.structure.column_names
+		raw = file._rawValue
+		return [dict((column, raw(id, column)) for column in columns) for id in self.ids()]
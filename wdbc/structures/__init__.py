@@ -2,42 +2,130 @@
 Base logic for pywow structures
 """
 
+import os.path
+from importlib import import_module
 from structures import Structure, Skeleton
 from .fields import *
-from .main import *
 from .generated import GeneratedStructure
+from .registry import MODULES, STRUCTURES
+from . import base
+
+
+REGISTRY_HEADER = '''# -*- coding: utf-8 -*-
+"""
+Index of the structure classes, in {file name: (module, class name)} format.
+Generated by StructureLoader.writeRegistry(), do not edit.
+"""
+
+'''
 
 
 class StructureNotFound(Exception):
 	pass
 
 class StructureLoader():
-	wowfiles = None
+	"""
+	Structures are looked up in the registry (see registry.py) and their
+	module is only imported the first time one of them is requested.
+	Structures missing from the registry are found by importing every
+	module in MODULES: run StructureLoader.writeRegistry() after adding
+	or renaming a structure.
+	"""
+	wowfiles = {} # name -> Structure class, for the structures loaded so far
+	_compiled = {} # (structure class, build) -> compiled structure, see compile()
+	_scanned = False
 
 	@classmethod
 	def setup(cls):
-		if cls.wowfiles is None:
-			cls.wowfiles = {}
-			for name in globals():
-				try:
-					if not issubclass(globals()[name], Structure):
-						continue
-				except TypeError:
-					continue
-				cls.wowfiles[name.lower()] = globals()[name]
+		"""
+		Imports every structure module and registers all their structures
+		"""
+		if not cls._scanned:
+			for module in MODULES:
+				module = import_module(".%s" % (module), __name__)
+				for name, structure in cls._structures(module):
+					cls.wowfiles.setdefault(name.lower(), structure)
+			cls._scanned = True
+
+	@staticmethod
+	def _structures(module):
+		"""
+		Returns the (class name, class) pairs of the structures defined in \a module
+		"""
+		for name, value in sorted(vars(module).items()):
+			if isinstance(value, type) and issubclass(value, Structure) and value.__module__ == module.__name__ and value is not base.Structure:
+				yield name, value
+
+	@classmethod
+	def names(cls):
+		"""
+		Returns the sorted names of the files which have a structure
+		"""
+		return sorted(set(STRUCTURES) | set(cls.wowfiles))
+
+	@classmethod
+	def load(cls, name):
+		"""
+		Returns the Structure class for the file \a name, importing its
+		module if needed. Returns None if there is no such structure.
+		"""
+		if name not in cls.wowfiles:
+			if name in STRUCTURES:
+				module, clsname = STRUCTURES[name]
+				module = import_module(".%s" % (module), __name__)
+				cls.wowfiles[name] = getattr(module, clsname)
+			else:
+				cls.setup()
+		return cls.wowfiles.get(name)
+
+	@classmethod
+	def writeRegistry(cls, path=None):
+		"""
+		Regenerates registry.py (or \a path) from the structure modules
+		"""
+		cls.setup()
+		path = path or os.path.join(os.path.dirname(__file__), "registry.py")
+		with open(path, "w") as f:
+			f.write(REGISTRY_HEADER)
+			f.write("MODULES = (%s)\n\n" % ("".join("\"%s\", " % (module) for module in MODULES)))
+			f.write("STRUCTURES = {\n")
+			for name in sorted(cls.wowfiles):
+				structure = cls.wowfiles[name]
+				module = structure.__module__.rsplit(".", 1)[-1]
+				f.write("\t\"%s\": (\"%s\", \"%s\"),\n" % (name, module, structure.__name__))
+			f.write("}\n")
+
+	@classmethod
+	def compile(cls, structure, build=0):
+		"""
+		Returns the Structure class \a structure resolved for \a build,
+		with its localized fields expanded (see LocalizedStringField).
+		Compiled structures are memoized per (structure, build) and
+		shared by every file and environment: they must not be modified.
+		"""
+		key = (structure, build)
+		if key not in cls._compiled:
+			instance = structure(build, None)
+			localize(instance, build)
+			cls._compiled.setdefault(key, instance)
+		return cls._compiled[key]
 
 	@classmethod
 	def getstructure(cls, name, build=0, parent=None):
+		"""
+		Returns the compiled structure for the file \a name.
+		\a parent is ignored, as structures are shared between files.
+		"""
 		name = name.replace("-", "_")
-		if name in cls.wowfiles:
-			return cls.wowfiles[name](build, parent)
+		structure = cls.load(name)
+		if structure is not None:
+			return cls.compile(structure, build)
 		raise StructureNotFound("Structure not found for file %r" % (name))
 
-StructureLoader.setup()
 getstructure = StructureLoader.getstructure
 
 
-class LocalizedStringField(Structure):
+class LocalizedStringField(base.Structure):
 	"""
 	Structure for the LocalizedField class
 	"""
@@ -81,3 +169,22 @@ class LocalizedStringField(Structure):
 
 	def changed_12025(self, fields):
 		self.changed_11927(fields)
+
+
+def localize(structure, build):
+	"""
+	Replaces the LocalizedFields of \a structure by the columns of
+	LocalizedStringField for \a build, eg. name -> name_enus, name_kokr...
+	"""
+	fieldidx = []
+	for i, field in enumerate(structure):
+		if isinstance(field, LocalizedField):
+			fieldidx.append((i, field.name))
+
+	if fieldidx:
+		from copy import copy
+		fields = LocalizedStringField(build=build)
+		for i, name in reversed(fieldidx):
+			# Build a copy of the fields
+			toinsert = [copy(field).rename("%s_%s" % (name, field.name)) for field in fields]
+			structure[i:i+1] = toinsert
@@ -1,7 +1,11 @@
 """
 pywow wdb/dbc field types
+Fields are shared between every file using their structure (see
+StructureLoader.compile()): anything depending on a file or its
+environment is looked up through the row being decoded.
 """
 
+from weakref import WeakKeyDictionary
 from structures.fields import *
 
 
@@ -89,7 +93,8 @@ class SubRow(object):
 	def __init__(self, field, row, structure):
 		self.__field = field
 		self.__row = row
-		self._structure = structure(row._parent.build, row._parent)
+		from . import StructureLoader
+		self._structure = StructureLoader.compile(structure, row._parent.build)
 
 	def __dir__(self):
 		result = self.__dict__.keys()
@@ -181,8 +186,8 @@ class ForeignKeyBase(IntegerField):
 
 	def to_python(self, value, row):
 		if isinstance(value, int):
-			self.raw_value = value
-			f = self.relationTable(value)
+			raw_value = value
+			f = self.relationTable(value, row)
 			key = self.relationKey(value, row)
 			try:
 				value = f[key]
@@ -193,21 +198,21 @@ class ForeignKeyBase(IntegerField):
 				else:
 					raise UnresolvedKey("Key %r does not exist in %s" % (key, f.structure.name()))
 
-			return self.get_final_value(value, row)
+			return self.get_final_value(value, row, raw_value)
 		return value
 
-	def relationTable(self, value):
+	def relationTable(self, value, row):
 		"""
-		Return the forward relation "table" (file) in the Environment
+		Return the forward relation "table" (file) in the Environment of \a row
 		"""
-		environment = self.parent.parent.environment
+		environment = row._parent.environment
 		relation = self.relation(value)
 		try:
 			return environment.dbFile(relation)
 		except KeyError:
 			raise UnresolvedTable("Table %r does not exist in the current environment" % (relation))
 
-	def get_final_value(self, value, row):
+	def get_final_value(self, value, row, raw_value):
 		return value
 
 	def relation(self, value):
@@ -239,17 +244,21 @@ class ForeignMask(BitMaskField):
 	def __init__(self, name, relation, **kwargs):
 		super(ForeignMask, self).__init__(name=name, **kwargs)
 		self._relation = relation
-		self.flags = {}
+		self._flags = WeakKeyDictionary() # relation file -> flags
 
-	def __init_flags(self):
-		env = self.parent.parent.environment
+	def __get_flags(self, row):
+		env = row._parent.environment
 		try:
 			f = env.dbFile(self._relation)
 		except KeyError:
-			raise UnresolvedTable("Relation %r does not exist in the current environment" % (self._relation), value)
+			raise UnresolvedTable("Relation %r does not exist in the current environment" % (self._relation))
 
-		for k in f:
-			self.flags[2 ** (k-1)] = f[k]
+		if f not in self._flags:
+			flags = {}
+			for k in f:
+				flags[2 ** (k-1)] = f[k]
+			self._flags[f] = flags
+		return self._flags[f]
 
 	def from_python(self, value):
 		assert isinstance(value, BitFlags)
@@ -259,9 +268,7 @@ class ForeignMask(BitMaskField):
 		if isinstance(value, BitFlags):
 			return value
 
-		if not self.flags:
-			self.__init_flags()
-		return BitMask(value, self.flags)
+		return BitMask(value, self.__get_flags(row))
 
 class ForeignByte(ForeignKey):
 	"""
@@ -297,14 +304,14 @@ class ForeignCell(ForeignKeyBase):
 		self.get_column = get_column
 		self.get_row = get_row
 
-	def get_final_value(self, value, row):
-		column = self.get_column(row, self.raw_value)
+	def get_final_value(self, value, row, raw_value):
+		column = self.get_column(row, raw_value)
 		if column:
 			return getattr(value, column)
-		return self.raw_value
+		return raw_value
 
 	def relationKey(self, value, row):
-		return self.get_row(row, self.raw_value)
+		return self.get_row(row, value)
 
 	def relation(self, value):
 		return self._relation
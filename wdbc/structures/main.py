@@ -2,99 +2,7 @@
 
 from .gameobject import GAME_OBJECT_TYPES
 from ..structures import *
-
-class Structure(Structure):
-	"""
-	Base structure for WDB/DBC files
-	This contains standard build branching such
-	as PTR/Beta/Live builds running concurrently
-	The changed builds can still be overwritten
-	"""
-
-	def __get_build(self, build):
-		builds = [k for k in self.get_builds() if k <= build]
-		if builds:
-			return getattr(self, "changed_%i" % (builds[-1]))
-
-		return lambda fields: None
-
-	def changed_11993(self, fields):
-		"""
-		PTR 3.3.5
-		"""
-		self.__get_build(11723)(fields)
-
-	def changed_12025(self, fields):
-		"""
-		F&F 4.0.0
-		"""
-		self.__get_build(11927)(fields)
-
-	def changed_12045(self, fields):
-		"""
-		PTR 3.3.5
-		"""
-		self.changed_11993(fields)
-
-	def changed_12065(self, fields):
-		"""
-		F&F 4.0.0
-		"""
-		self.changed_12025(fields)
-
-	def changed_12122(self, fields):
-		"""
-		F&F 4.0.0
-		"""
-		self.changed_12065(fields)
-
-	def changed_12124(self, fields):
-		"""
-		PTR 3.3.5
-		"""
-		self.changed_12045(fields)
-
-	def changed_12148(self, fields):
-		"""
-		PTR 3.3.5
-		"""
-		self.changed_12124(fields)
-
-	def changed_12164(self, fields):
-		"""
-		F&F 4.0.0
-		"""
-		self.changed_12122(fields)
-
-	def changed_12166(self, fields):
-		"""
-		PTR 3.3.5
-		"""
-		self.changed_12148(fields)
-
-	def changed_12232(self, fields):
-		"""
-		Closed Beta 4.0.0
-		"""
-		self.changed_12164(fields)
-
-	def changed_12319(self, fields):
-		"""
-		Closed Beta 4.0.0
-		"""
-		self.changed_12232(fields)
-
-	def changed_12340(self, fields):
-		"""
-		Live 3.3.5a
-		"""
-		self.changed_12166(fields)
-
-	def changed_12379(self, fields):
-		"""
-		Closed Beta 4.0.0
-		"""
-		self.changed_12319(fields)
+from .base import Structure
 
 
 ##
@@ -0,0 +1,340 @@
+# -*- coding: utf-8 -*-
+"""
+Index of the structure classes, in {file name: (module, class name)} format.
+Generated by StructureLoader.writeRegistry(), do not edit.
+"""
+
+MODULES = ("main", )
+
+STRUCTURES = {
+	"achievement": ("main", "Achievement"),
+	"achievement_category": ("main", "Achievement_Category"),
+	"achievement_criteria": ("main", "Achievement_Criteria"),
+	"animationdata": ("main", "AnimationData"),
+	"animkit": ("main", "AnimKit"),
+	"animkitboneset": ("main", "AnimKitBoneSet"),
+	"animkitbonesetalias": ("main", "AnimKitBoneSetAlias"),
+	"animkitconfig": ("main", "AnimKitConfig"),
+	"animkitconfigboneset": ("main", "AnimKitConfigBoneSet"),
+	"animkitpriority": ("main", "AnimKitPriority"),
+	"animkitsegment": ("main", "AnimKitSegment"),
+	"animreplacement": ("main", "AnimReplacement"),
+	"animreplacementset": ("main", "AnimReplacementSet"),
+	"areaassignment": ("main", "AreaAssignment"),
+	"areagroup": ("main", "AreaGroup"),
+	"areapoi": ("main", "AreaPOI"),
+	"areapoisortedworldstate": ("main", "AreaPOISortedWorldState"),
+	"areatable": ("main", "AreaTable"),
+	"areatrigger": ("main", "AreaTrigger"),
+	"armorlocation": ("main", "ArmorLocation"),
+	"attackanimkits": ("main", "AttackAnimKits"),
+	"attackanimtypes": ("main", "AttackAnimTypes"),
+	"auctionhouse": ("main", "AuctionHouse"),
+	"baddons": ("main", "Baddons"),
+	"bankbagslotprices": ("main", "BankBagSlotPrices"),
+	"bannedaddons": ("main", "BannedAddons"),
+	"barbershopstyle": ("main", "BarberShopStyle"),
+	"battlemasterlist": ("main", "BattlemasterList"),
+	"cameramode": ("main", "CameraMode"),
+	"camerashakes": ("main", "CameraShakes"),
+	"castableraidbuffs": ("main", "CastableRaidBuffs"),
+	"cfg_categories": ("main", "Cfg_Categories"),
+	"cfg_configs": ("main", "Cfg_Configs"),
+	"charactercreatecameras": ("main", "CharacterCreateCameras"),
+	"characterfacialhairstyles": ("main", "CharacterFacialHairStyles"),
+	"charbaseinfo": ("main", "CharBaseInfo"),
+	"charhairgeosets": ("main", "CharHairGeosets"),
+	"charhairtextures": ("main", "CharHairTextures"),
+	"charsections": ("main", "CharSections"),
+	"charstartoutfit": ("main", "CharStartOutfit"),
+	"chartitles": ("main", "CharTitles"),
+	"charvariations": ("main", "CharVariations"),
+	"chatchannels": ("main", "ChatChannels"),
+	"chatprofanity": ("main", "ChatProfanity"),
+	"chrclasses": ("main", "ChrClasses"),
+	"chrraces": ("main", "ChrRaces"),
+	"cinematiccamera": ("main", "CinematicCamera"),
+	"cinematicsequences": ("main", "CinematicSequences"),
+	"creaturecache": ("main", "CreatureCache"),
+	"creaturedisplayinfo": ("main", "CreatureDisplayInfo"),
+	"creaturedisplayinfoextra": ("main", "CreatureDisplayInfoExtra"),
+	"creaturefamily": ("main", "CreatureFamily"),
+	"creaturemodeldata": ("main", "CreatureModelData"),
+	"creaturemovementinfo": ("main", "CreatureMovementInfo"),
+	"creaturesounddata": ("main", "CreatureSoundData"),
+	"creaturespelldata": ("main", "CreatureSpellData"),
+	"creaturetype": ("main", "CreatureType"),
+	"currencycategory": ("main", "CurrencyCategory"),
+	"currencytypes": ("main", "CurrencyTypes"),
+	"dancemoves": ("main", "DanceMoves"),
+	"deaththudlookups": ("main", "DeathThudLookups"),
+	"declinedword": ("main", "DeclinedWord"),
+	"declinedwordcases": ("main", "DeclinedWordCases"),
+	"destructiblemodeldata": ("main", "DestructibleModelData"),
+	"dungeonencounter": ("main", "DungeonEncounter"),
+	"dungeonmap": ("main", "DungeonMap"),
+	"dungeonmapchunk": ("main", "DungeonMapChunk"),
+	"durabilitycosts": ("main", "DurabilityCosts"),
+	"durabilityquality": ("main", "DurabilityQuality"),
+	"emotes": ("main", "Emotes"),
+	"emotestext": ("main", "EmotesText"),
+	"emotestextdata": ("main", "EmotesTextData"),
+	"emotestextsound": ("main", "EmotesTextSound"),
+	"environmentaldamage": ("main", "EnvironmentalDamage"),
+	"exhaustion": ("main", "Exhaustion"),
+	"faction": ("main", "Faction"),
+	"factiongroup": ("main", "FactionGroup"),
+	"factiontemplate": ("main", "FactionTemplate"),
+	"filedata": ("main", "FileData"),
+	"footprinttextures": ("main", "FootprintTextures"),
+	"footstepterrainlookup": ("main", "FootstepTerrainLookup"),
+	"gameobjectartkit": ("main", "GameObjectArtKit"),
+	"gameobjectcache": ("main", "GameObjectCache"),
+	"gameobjectdisplayinfo": ("main", "GameObjectDisplayInfo"),
+	"gametabledbc": ("main", "GameTableDBC"),
+	"gametables": ("main", "GameTables"),
+	"gametips": ("main", "GameTips"),
+	"gemproperties": ("main", "GemProperties"),
+	"gluescreenemote": ("main", "GlueScreenEmote"),
+	"glyphproperties": ("main", "GlyphProperties"),
+	"glyphslot": ("main", "GlyphSlot"),
+	"gmsurveyanswers": ("main", "GMSurveyAnswers"),
+	"gmsurveycurrentsurvey": ("main", "GMSurveyCurrentSurvey"),
+	"gmsurveyquestions": ("main", "GMSurveyQuestions"),
+	"gmsurveysurveys": ("main", "GMSurveySurveys"),
+	"gmticketcategory": ("main", "GMTicketCategory"),
+	"groundeffectdoodad": ("main", "GroundEffectDoodad"),
+	"groundeffecttexture": ("main", "GroundEffectTexture"),
+	"gtbarbershopcostbase": ("main", "gtBarberShopCostBase"),
+	"gtchancetomeleecrit": ("main", "gtChanceToMeleeCrit"),
+	"gtchancetomeleecritbase": ("main", "gtChanceToMeleeCritBase"),
+	"gtchancetospellcrit": ("main", "gtChanceToSpellCrit"),
+	"gtchancetospellcritbase": ("main", "gtChanceToSpellCritBase"),
+	"gtcombatratings": ("main", "gtCombatRatings"),
+	"gtmasterymultipliers": ("main", "gtMasteryMultipliers"),
+	"gtnpcmanacostscaler": ("main", "gtNPCManaCostScaler"),
+	"gtoctclasscombatratingscalar": ("main", "gtOCTClassCombatRatingScalar"),
+	"gtoctregenhp": ("main", "gtOCTRegenHP"),
+	"gtoctregenmp": ("main", "gtOCTRegenMP"),
+	"gtregenhpperspt": ("main", "gtRegenHPPerSpt"),
+	"gtregenmpperspt": ("main", "gtRegenMPPerSpt"),
+	"gtshieldblockregular": ("main", "gtShieldBlockRegular"),
+	"gtspellscaling": ("main", "gtSpellScaling"),
+	"guildcolorbackground": ("main", "GuildColorBackground"),
+	"guildcolorborder": ("main", "GuildColorBorder"),
+	"guildcoloremblem": ("main", "GuildColorEmblem"),
+	"guildperkspells": ("main", "GuildPerkSpells"),
+	"helmetgeosetvisdata": ("main", "HelmetGeosetVisData"),
+	"holidaydescriptions": ("main", "HolidayDescriptions"),
+	"holidaynames": ("main", "HolidayNames"),
+	"holidays": ("main", "Holidays"),
+	"item": ("main", "Item"),
+	"item_sparse": ("main", "Item_sparse"),
+	"itemarmorquality": ("main", "ItemArmorQuality"),
+	"itemarmorshield": ("main", "ItemArmorShield"),
+	"itemarmortotal": ("main", "ItemArmorTotal"),
+	"itembagfamily": ("main", "ItemBagFamily"),
+	"itemcache": ("main", "ItemCache"),
+	"itemclass": ("main", "ItemClass"),
+	"itemcondextcosts": ("main", "ItemCondExtCosts"),
+	"itemdamageammo": ("main", "ItemDamageAmmo"),
+	"itemdamageonehand": ("main", "ItemDamageOneHand"),
+	"itemdamageonehandcaster": ("main", "ItemDamageOneHandCaster"),
+	"itemdamageranged": ("main", "ItemDamageRanged"),
+	"itemdamagethrown": ("main", "ItemDamageThrown"),
+	"itemdamagetwohand": ("main", "ItemDamageTwoHand"),
+	"itemdamagetwohandcaster": ("main", "ItemDamageTwoHandCaster"),
+	"itemdamagewand": ("main", "ItemDamageWand"),
+	"itemdisplayinfo": ("main", "ItemDisplayInfo"),
+	"itemextendedcost": ("main", "ItemExtendedCost"),
+	"itemgroupsounds": ("main", "ItemGroupSounds"),
+	"itemlimitcategory": ("main", "ItemLimitCategory"),
+	"itemnamecache": ("main", "ItemNameCache"),
+	"itempetfood": ("main", "ItemPetFood"),
+	"itempurchasegroup": ("main", "ItemPurchaseGroup"),
+	"itemrandomproperties": ("main", "ItemRandomProperties"),
+	"itemrandomsuffix": ("main", "ItemRandomSuffix"),
+	"itemreforge": ("main", "ItemReforge"),
+	"itemset": ("main", "ItemSet"),
+	"itemsubclass": ("main", "ItemSubClass"),
+	"itemsubclassmask": ("main", "ItemSubClassMask"),
+	"itemtextcache": ("main", "ItemTextCache"),
+	"itemvisualeffects": ("main", "ItemVisualEffects"),
+	"itemvisuals": ("main", "ItemVisuals"),
+	"keychain": ("main", "KeyChain"),
+	"languages": ("main", "Languages"),
+	"languagewords": ("main", "LanguageWords"),
+	"lfgdungeonexpansion": ("main", "LFGDungeonExpansion"),
+	"lfgdungeongroup": ("main", "LFGDungeonGroup"),
+	"lfgdungeons": ("main", "LFGDungeons"),
+	"light": ("main", "Light"),
+	"lightfloatband": ("main", "LightFloatBand"),
+	"lightintband": ("main", "LightIntBand"),
+	"lightparams": ("main", "LightParams"),
+	"lightskybox": ("main", "LightSkybox"),
+	"liquidmaterial": ("main", "LiquidMaterial"),
+	"liquidtype": ("main", "LiquidType"),
+	"loadingscreens": ("main", "LoadingScreens"),
+	"loadingscreentaxisplines": ("main", "LoadingScreenTaxiSplines"),
+	"lock": ("main", "Lock"),
+	"locktype": ("main", "LockType"),
+	"mailtemplate": ("main", "MailTemplate"),
+	"map": ("main", "Map"),
+	"mapdifficulty": ("main", "MapDifficulty"),
+	"material": ("main", "Material"),
+	"mountcapability": ("main", "MountCapability"),
+	"movie": ("main", "Movie"),
+	"moviefiledata": ("main", "MovieFileData"),
+	"movievariation": ("main", "MovieVariation"),
+	"namegen": ("main", "NameGen"),
+	"namesprofanity": ("main", "NamesProfanity"),
+	"namesreserved": ("main", "NamesReserved"),
+	"npccache": ("main", "NPCCache"),
+	"npcsounds": ("main", "NPCSounds"),
+	"numtalentsatlevel": ("main", "NumTalentsAtLevel"),
+	"objecteffect": ("main", "ObjectEffect"),
+	"objecteffectgroup": ("main", "ObjectEffectGroup"),
+	"objecteffectmodifier": ("main", "ObjectEffectModifier"),
+	"objecteffectpackage": ("main", "ObjectEffectPackage"),
+	"objecteffectpackageelem": ("main", "ObjectEffectPackageElem"),
+	"overridespelldata": ("main", "OverrideSpellData"),
+	"package": ("main", "Package"),
+	"pagetextcache": ("main", "PageTextCache"),
+	"pagetextmaterial": ("main", "PageTextMaterial"),
+	"paperdollitemframe": ("main", "PaperDollItemFrame"),
+	"particlecolor": ("main", "ParticleColor"),
+	"petitiontype": ("main", "PetitionType"),
+	"petloyalty": ("main", "PetLoyalty"),
+	"petpersonality": ("main", "PetPersonality"),
+	"phase": ("main", "Phase"),
+	"phasexphasegroup": ("main", "PhaseXPhaseGroup"),
+	"powerdisplay": ("main", "PowerDisplay"),
+	"pvpdifficulty": ("main", "PvpDifficulty"),
+	"questcache": ("main", "QuestCache"),
+	"questfactionreward": ("main", "QuestFactionReward"),
+	"questinfo": ("main", "QuestInfo"),
+	"questsort": ("main", "QuestSort"),
+	"questxp": ("main", "QuestXP"),
+	"randproppoints": ("main", "RandPropPoints"),
+	"researchbranch": ("main", "ResearchBranch"),
+	"researchfield": ("main", "ResearchField"),
+	"researchproject": ("main", "ResearchProject"),
+	"researchsite": ("main", "ResearchSite"),
+	"resistances": ("main", "Resistances"),
+	"scalingstatdistribution": ("main", "ScalingStatDistribution"),
+	"scalingstatvalues": ("main", "ScalingStatValues"),
+	"screeneffect": ("main", "ScreenEffect"),
+	"servermessages": ("main", "ServerMessages"),
+	"sheathesoundlookups": ("main", "SheatheSoundLookups"),
+	"skillcostsdata": ("main", "SkillCostsData"),
+	"skillline": ("main", "SkillLine"),
+	"skilllineability": ("main", "SkillLineAbility"),
+	"skilllineabilitysortedspell": ("main", "SkillLineAbilitySortedSpell"),
+	"skilllinecategory": ("main", "SkillLineCategory"),
+	"skillraceclassinfo": ("main", "SkillRaceClassInfo"),
+	"skilltiers": ("main", "SkillTiers"),
+	"soundambience": ("main", "SoundAmbience"),
+	"soundcharactermacrolines": ("main", "SoundCharacterMacroLines"),
+	"soundemitters": ("main", "SoundEmitters"),
+	"soundentries": ("main", "SoundEntries"),
+	"soundentriesadvanced": ("main", "SoundEntriesAdvanced"),
+	"soundfilter": ("main", "SoundFilter"),
+	"soundfilterelem": ("main", "SoundFilterElem"),
+	"soundproviderpreferences": ("main", "SoundProviderPreferences"),
+	"soundsamplepreferences": ("main", "SoundSamplePreferences"),
+	"soundwatertype": ("main", "SoundWaterType"),
+	"spammessages": ("main", "SpamMessages"),
+	"spell": ("main", "Spell"),
+	"spellactivationoverlay": ("main", "SpellActivationOverlay"),
+	"spellauranames": ("main", "SpellAuraNames"),
+	"spellauraoptions": ("main", "SpellAuraOptions"),
+	"spellaurarestrictions": ("main", "SpellAuraRestrictions"),
+	"spellcastingrequirements": ("main", "SpellCastingRequirements"),
+	"spellcasttimes": ("main", "SpellCastTimes"),
+	"spellcategories": ("main", "SpellCategories"),
+	"spellcategory": ("main", "SpellCategory"),
+	"spellchaineffects": ("main", "SpellChainEffects"),
+	"spellclassoptions": ("main", "SpellClassOptions"),
+	"spellcooldowns": ("main", "SpellCooldowns"),
+	"spelldescriptionvariables": ("main", "SpellDescriptionVariables"),
+	"spelldifficulty": ("main", "SpellDifficulty"),
+	"spelldispeltype": ("main", "SpellDispelType"),
+	"spellduration": ("main", "SpellDuration"),
+	"spelleffect": ("main", "SpellEffect"),
+	"spelleffectcamerashakes": ("main", "SpellEffectCameraShakes"),
+	"spelleffectnames": ("main", "SpellEffectNames"),
+	"spellequippeditems": ("main", "SpellEquippedItems"),
+	"spellflyout": ("main", "SpellFlyout"),
+	"spellflyoutitem": ("main", "SpellFlyoutItem"),
+	"spellfocusobject": ("main", "SpellFocusObject"),
+	"spellicon": ("main", "SpellIcon"),
+	"spellinterrupts": ("main", "SpellInterrupts"),
+	"spellitemenchantment": ("main", "SpellItemEnchantment"),
+	"spellitemenchantmentcondition": ("main", "SpellItemEnchantmentCondition"),
+	"spelllevels": ("main", "SpellLevels"),
+	"spellmastery": ("main", "SpellMastery"),
+	"spellmechanic": ("main", "SpellMechanic"),
+	"spellmissile": ("main", "SpellMissile"),
+	"spellmissilemotion": ("main", "SpellMissileMotion"),
+	"spellpower": ("main", "SpellPower"),
+	"spellradius": ("main", "SpellRadius"),
+	"spellrange": ("main", "SpellRange"),
+	"spellreagents": ("main", "SpellReagents"),
+	"spellrunecost": ("main", "SpellRuneCost"),
+	"spellscaling": ("main", "SpellScaling"),
+	"spellshapeshift": ("main", "SpellShapeshift"),
+	"spellshapeshiftform": ("main", "SpellShapeshiftForm"),
+	"spelltargetrestrictions": ("main", "SpellTargetRestrictions"),
+	"spelltotems": ("main", "SpellTotems"),
+	"spellvisual": ("main", "SpellVisual"),
+	"spellvisualeffectname": ("main", "SpellVisualEffectName"),
+	"spellvisualkit": ("main", "SpellVisualKit"),
+	"spellvisualkitareamodel": ("main", "SpellVisualKitAreaModel"),
+	"spellvisualkitmodelattach": ("main", "SpellVisualKitModelAttach"),
+	"spellvisualprecasttransitions": ("main", "SpellVisualPrecastTransitions"),
+	"stableslotprices": ("main", "StableSlotPrices"),
+	"startup_strings": ("main", "Startup_Strings"),
+	"stationery": ("main", "Stationery"),
+	"stringlookups": ("main", "StringLookups"),
+	"summonproperties": ("main", "SummonProperties"),
+	"talent": ("main", "Talent"),
+	"talenttab": ("main", "TalentTab"),
+	"talenttreeprimaryspells": ("main", "TalentTreePrimarySpells"),
+	"taxinodes": ("main", "TaxiNodes"),
+	"taxipath": ("main", "TaxiPath"),
+	"taxipathnode": ("main", "TaxiPathNode"),
+	"teamcontributionpoints": ("main", "TeamContributionPoints"),
+	"terraintype": ("main", "TerrainType"),
+	"terraintypesounds": ("main", "TerrainTypeSounds"),
+	"totemcategory": ("main", "TotemCategory"),
+	"transportanimation": ("main", "TransportAnimation"),
+	"transportphysics": ("main", "TransportPhysics"),
+	"transportrotation": ("main", "TransportRotation"),
+	"uisoundlookups": ("main", "UISoundLookups"),
+	"unitblood": ("main", "UnitBlood"),
+	"unitbloodlevels": ("main", "UnitBloodLevels"),
+	"vehicle": ("main", "Vehicle"),
+	"vehicleseat": ("main", "VehicleSeat"),
+	"vehicleuiindicator": ("main", "VehicleUIIndicator"),
+	"vehicleuiindseat": ("main", "VehicleUIIndSeat"),
+	"videohardware": ("main", "VideoHardware"),
+	"vocaluisounds": ("main", "VocalUISounds"),
+	"weaponimpactsounds": ("main", "WeaponImpactSounds"),
+	"weaponswingsounds2": ("main", "WeaponSwingSounds2"),
+	"weather": ("main", "Weather"),
+	"wmoareatable": ("main", "WMOAreaTable"),
+	"worldchunksounds": ("main", "WorldChunkSounds"),
+	"worldmaparea": ("main", "WorldMapArea"),
+	"worldmapcontinent": ("main", "WorldMapContinent"),
+	"worldmapoverlay": ("main", "WorldMapOverlay"),
+	"worldmaptransforms": ("main", "WorldMapTransforms"),
+	"worldsafelocs": ("main", "WorldSafeLocs"),
+	"worldstateui": ("main", "WorldStateUI"),
+	"worldstatezonesounds": ("main", "WorldStateZoneSounds"),
+	"wowcache": ("main", "WoWCache"),
+	"wowerror_strings": ("main", "WowError_Strings"),
+	"zoneintromusictable": ("main", "ZoneIntroMusicTable"),
+	"zonelight": ("main", "ZoneLight"),
+	"zonelightpoint": ("main", "ZoneLightPoint"),
+	"zonemusic": ("main", "ZoneMusic"),
+}
@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+"""
+Persistent on-disk cache of DBC/DB2 tables
+"""
+
+import os
+import os.path
+from array import array
+from hashlib import sha1
+from struct import Struct
+from .log import log
+from .mapped import MappedFile
+from .utils import getfilename
+
+
+# magic, format version, structure version, row_count, reclen, stringblocksize, address count
+HEADER = Struct("<4sI20s4I")
+MAGIC = "PWTC"
+VERSION = 1
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class TableCache(object):
+	"""
+	On-disk cache of the tables opened by DBCFile and DB2File.
+
+	A cached table is stored in <path>/<build>/<locale>/<table>.<hash>
+	where hash is the sha1 of the source file. It contains:
+	- A header (see HEADER)
+	- The address table as (id, record index) native int32 pairs
+	- The records, as found in the source file
+	- The stringblock
+	Cached tables are memory-mapped back, and the address table never
+	has to be scanned. The entries are invalidated by the content hash
+	(file name) and by the structure version (a hash of the resolved
+	column layout).
+
+	Source files on disk are not hashed again while their path, size
+	and modification time are the same: <table>.<metadata>.ref holds
+	the hash of the source with that metadata (see _metadata()). Other
+	sources (eg. MPQ handles) are hashed on every load.
+
+	The default path is $PYWOW_CACHE_DIR, or ~/.cache/pywow.
+	"""
+
+	def __init__(self, path=None):
+		self.path = path or os.environ.get("PYWOW_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "pywow"))
+
+	def __repr__(self):
+		return "%s(%r)" % (self.__class__.__name__, self.path)
+
+	def _hash(self, file):
+		"""
+		Returns the sha1 of the source file of \a file
+		"""
+		if file._buffer is not None:
+			return sha1(file._buffer).hexdigest()
+
+		ret = sha1()
+		f = file.file
+		f.seek(0)
+		while True:
+			data = f.read(CHUNK_SIZE)
+			if not data:
+				break
+			ret.update(data)
+		return ret.hexdigest()
+
+	def _metadata(self, file):
+		"""
+		Returns a digest of the path, size and modification time of the
+		source file of \a file, or None if it is not a file on disk
+		"""
+		f = file.file
+		path = getattr(f, "path", None) # MappedFile
+		try:
+			if path is not None:
+				stat = os.stat(path)
+			else:
+				stat = os.fstat(f.fileno())
+				path = f.name
+		except (AttributeError, IOError, OSError, ValueError):
+			return None
+		return sha1(repr((os.path.abspath(path), stat.st_size, stat.st_mtime))).hexdigest()
+
+	def _writeRef(self, path, digest):
+		# Write atomically so that concurrent processes never see partial refs
+		directory = os.path.dirname(path)
+		if not os.path.exists(directory):
+			try:
+				os.makedirs(directory)
+			except OSError: # Created by another process
+				pass
+		tmp = "%s.%i.tmp" % (path, os.getpid())
+		with open(tmp, "w") as f:
+			f.write(digest)
+		os.rename(tmp, path)
+
+	def _structureVersion(self, file):
+		"""
+		Returns a digest of the resolved layout of the file's structure
+		"""
+		layout = [(field.name, offset, char) for field, (offset, char) in zip(file.structure, file._recordLayout())]
+		return sha1(repr((file.structure.__class__.__name__, layout))).digest()
+
+	def filename(self, file):
+		"""
+		Returns the path of the cached table for \a file. The source is
+		only hashed if its metadata is unknown (see _metadata()).
+		"""
+		locale = getattr(file.environment, "locale", None) or "any"
+		directory = os.path.join(self.path, str(file.build), locale)
+		name = getfilename(file.file.name)
+		metadata = self._metadata(file)
+		digest = None
+		if metadata is not None:
+			ref = os.path.join(directory, "%s.%s.ref" % (name, metadata))
+			try:
+				with open(ref, "r") as f:
+					digest = f.read().strip()
+			except IOError:
+				pass
+
+		if not digest:
+			digest = self._hash(file)
+			if metadata is not None:
+				self._writeRef(ref, digest)
+		return os.path.join(directory, "%s.%s" % (name, digest))
+
+	def load(self, file):
+		"""
+		Loads the cached table for \a file, if any. On success, the
+		file's addresses are set up and its records and strings are
+		read from the cache's mapping. Returns whether the table
+		was found in the cache.
+		"""
+		if not file._columns():
+			return False
+
+		path = self.filename(file)
+		file._tablecachePath = path
+		if not os.path.exists(path):
+			return False
+
+		try:
+			cached = MappedFile(path)
+		except (IOError, OSError), e:
+			log.warning("Could not open cached table %r: %s" % (path, e))
+			return False
+
+		buffer = cached.buffer
+		header = file.header
+		expected = (MAGIC, VERSION, self._structureVersion(file), header.row_count, header.reclen, header.stringblocksize)
+		if len(buffer) < HEADER.size or HEADER.unpack_from(buffer, 0)[:-1] != expected:
+			log.info("Cached table %r is outdated" % (path))
+			cached.close()
+			return False
+
+		count = HEADER.unpack_from(buffer, 0)[-1]
+		start = HEADER.size
+		reclen = header.reclen
+		addresses = array("i")
+		addresses.fromstring(buffer[start:start + count * 8])
+		start += count * 8
+
+		ids = addresses[::2]
+		records = (start + index * reclen for index in addresses[1::2])
+		file._addresses = dict((id, (address, reclen)) for id, address in zip(ids, records))
+		file._tablecache = cached # Keep the mapping alive
+		file._buffer = buffer
+		file._dataOffset = start
+		file._strings = None
+		return True
+
+	def save(self, file):
+		"""
+		Writes the cached table for \a file
+		"""
+		if not file._columns():
+			return
+
+		path = getattr(file, "_tablecachePath", None) or self.filename(file)
+		header = file.header
+		reclen = header.reclen
+		data, start = file._records()
+
+		addresses = array("i")
+		for id, (address, _reclen) in sorted(file._addresses.items(), key=lambda k: k[1]):
+			addresses.append(id)
+			addresses.append((address - file._dataOffset) // reclen)
+
+		if file._strings is None:
+			file._loadStrings()
+		strings, offset = file._strings
+
+		directory = os.path.dirname(path)
+		if not os.path.exists(directory):
+			os.makedirs(directory)
+
+		# Write atomically so that concurrent processes never see partial tables
+		tmp = "%s.%i.tmp" % (path, os.getpid())
+		with open(tmp, "wb") as f:
+			f.write(HEADER.pack(MAGIC, VERSION, self._structureVersion(file), header.row_count, reclen, header.stringblocksize, len(addresses) // 2))
+			f.write(addresses.tostring())
+			begin = file._dataOffset - start
+			f.write(data[begin:begin + header.row_count * reclen])
+			f.write(strings[offset:])
+		os.rename(tmp, path)
+		log.info("Cached table written at %s" % (path))
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""
+Checks for pywow.wdbc:
+ - Importing pywow.wdbc and its file formats stays cheap: the structure
+   modules must only be imported on the first getstructure() call.
+ - Tables without an id column can be decoded.
+ - Writing a table to another path doesn't alter the opened file.
+ - The table cache only hashes sources whose metadata is unknown.
+
+	python -m pywow.wdbc.tests
+"""
+
+import os.path
+import shutil
+import subprocess
+import sys
+import tempfile
+from struct import pack
+
+# Maximum time to import pywow.wdbc, in seconds (with compiled .pyc files).
+# The main guard is the sys.modules check: this only catches slow imports.
+MAX_IMPORT_TIME = 0.25
+
+# Run in a new interpreter, so that nothing is imported yet
+SCRIPT = """
+import sys, time
+start = time.time()
+import pywow.wdbc
+import pywow.wdbc.dbc, pywow.wdbc.db2, pywow.wdbc.wdb
+print time.time() - start
+print "pywow.wdbc.structures.main" in sys.modules
+"""
+
+def checkImport():
+	output = subprocess.check_output([sys.executable, "-c", SCRIPT])
+	elapsed, eager = output.split()
+	elapsed = float(elapsed)
+
+	assert eager == "False", "pywow.wdbc imports pywow.wdbc.structures.main"
+	assert elapsed < MAX_IMPORT_TIME, "Importing pywow.wdbc took %.3fs (max %.3fs)" % (elapsed, MAX_IMPORT_TIME)
+	print "import pywow.wdbc: OK (%.3fs)" % (elapsed)
+
+def checkImplicitIds():
+	"""
+	Decodes the rows of a table without an id column (CharBaseInfo
+	before 3.3.5) through a bounded row cache
+	"""
+	from pywow import wdbc
+	rows = [(race, race % 11 + 1) for race in range(1, 101)]
+	directory = tempfile.mkdtemp()
+	try:
+		path = os.path.join(directory, "CharBaseInfo.dbc")
+		with open(path, "wb") as f:
+			f.write(pack("<4s4I", "WDBC", len(rows), 2, 2, 1))
+			for race, cls in rows:
+				f.write(pack("<BB", race, cls))
+			f.write("\0")
+
+		f = wdbc.open(path, build=10000)
+		f.setRowCache(wdbc.LRURowCache(maxbytes=1024 * 1024))
+		assert [list(f[id]) for id in sorted(f)] == [list(row) for row in rows], "The rows differ"
+		assert [f[id]._raw("class") for id in sorted(f)] == [cls for race, cls in rows], "The columns differ"
+	finally:
+		shutil.rmtree(directory)
+
+	print "Implicit ids: OK (%i rows)" % (len(rows))
+
+def checkWriteElsewhere():
+	"""
+	Writing a modified table to another path leaves the opened file
+	(header, addresses, strings) as it was
+	"""
+	from pywow import wdbc
+	rows = [(id, "word %i" % (id), id % 7) for id in range(1, 301)]
+	directory = tempfile.mkdtemp()
+	try:
+		path = os.path.join(directory, "ChatProfanity.dbc")
+		strings = "\0"
+		with open(path, "wb") as f:
+			records = []
+			for id, word, language in rows:
+				records.append(pack("<iIi", id, len(strings), language))
+				strings += word + "\0"
+			f.write(pack("<4s4I", "WDBC", len(rows), 3, 12, len(strings)))
+			f.write("".join(records))
+			f.write(strings)
+
+		f = wdbc.open(path, build=12340)
+		header = f.header
+		for id in range(1, 301, 2):
+			del f[id]
+		expected = [row for row in rows if row[0] % 2 == 0]
+		other = os.path.join(directory, "other", "ChatProfanity.dbc")
+		os.mkdir(os.path.dirname(other))
+		f.write(other)
+
+		assert f.header == header, "The header of the opened file changed"
+		assert [tuple(row) for row in f.filter(_id__gte=0)] == expected, "The rows of the opened file changed"
+		g = wdbc.open(other, build=12340)
+		assert [tuple(g[id]) for id in sorted(g)] == expected, "The rows written differ"
+	finally:
+		shutil.rmtree(directory)
+
+	print "Write to another file: OK (%i rows)" % (len(expected))
+
+def checkTableCacheMetadata():
+	"""
+	Opens a table three times through a TableCache: the source is only
+	hashed on the first load and after its modification time changed,
+	and the cached table is reused in both cases
+	"""
+	from pywow import wdbc
+	rows = [(race, race % 11 + 1) for race in range(1, 101)]
+	directory = tempfile.mkdtemp()
+	try:
+		path = os.path.join(directory, "CharBaseInfo.dbc")
+		with open(path, "wb") as f:
+			f.write(pack("<4s4I", "WDBC", len(rows), 2, 2, 1))
+			for race, cls in rows:
+				f.write(pack("<BB", race, cls))
+			f.write("\0")
+
+		hashed = []
+		class CountingCache(wdbc.TableCache):
+			def _hash(self, file):
+				hashed.append(file)
+				return super(CountingCache, self)._hash(file)
+		cache = CountingCache(os.path.join(directory, "cache"))
+
+		for touch in (False, False, True):
+			if touch:
+				mtime = os.stat(path).st_mtime + 10
+				os.utime(path, (mtime, mtime))
+			f = wdbc.open(path, build=10000, tablecache=cache)
+			assert [tuple(f[id]) for id in sorted(f)] == rows, "The rows differ"
+		assert len(hashed) == 2, "The source was hashed %i times" % (len(hashed))
+		assert f._tablecache is not None, "The cached table was not reused"
+	finally:
+		shutil.rmtree(directory)
+
+	print "Table cache metadata: OK (%i hashes)" % (len(hashed))
+
+def main():
+	checkImport()
+	checkImplicitIds()
+	checkWriteElsewhere()
+	checkTableCacheMetadata()
+
+if __name__ == "__main__":
+	main()
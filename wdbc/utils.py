@@ -27,12 +27,19 @@ def generate_structure(db):
 	return GeneratedStructure(structure_string)
 
 
-def fopen(f, build=0, structure=None, environment={}):
+def fopen(f, build=0, structure=None, environment={}, mmap=False, tablecache=None):
+	"""
+	Opens the DBFile \a f, which may be a path or a file-like object.
+	If \a mmap is True and \a f is a path, the file is memory-mapped
+	instead of being read through a regular file object.
+	DBC and DB2 files are looked up in \a tablecache (a TableCache) if given.
+	"""
+	from .mapped import MappedFile
 	from .structures import StructureNotFound, getstructure
 
 	if isinstance(f, basestring):
 		# open() the file only if passing a path
-		f = open(f, "rb")
+		f = MappedFile(f) if mmap else open(f, "rb")
 	filename = getfilename(f.name)
 	f.seek(0)
 	signature = f.read(4)
@@ -70,7 +77,10 @@ def fopen(f, build=0, structure=None, environment={}):
 		cls = WDBFile
 
 	f.seek(0)
-	return cls.open(f, build=build, structure=structure, environment=environment)
+	kwargs = {}
+	if tablecache is not None and signature in ("WDBC", "WDB2", "WCH2"):
+		kwargs["tablecache"] = tablecache
+	return cls.open(f, build=build, structure=structure, environment=environment, **kwargs)
 
 
 def new(name, build=0, structure=None, environment={}):
@@ -88,16 +98,60 @@ def new(name, build=0, structure=None, environment={}):
 	return WDBFile(file, build=build, structure=structure, environment=environment)
 
 
-__envcache = {}
 def get(name, build, locale="enUS"):
-	from ..environment import Environment, highestBuild
-	if build == -1:
-		build = highestBuild()
+	"""
+	Returns the DBFile \a name of \a build (-1 for the highest build)
+	and \a locale, from the default environment pool (see
+	environment.pool.EnvironmentPool).
+	"""
+	from ..environment.pool import defaultPool
+	return defaultPool.get(name, build, locale)
 
-	if build not in __envcache:
-		__envcache[build] = {}
 
-	if locale not in __envcache[build]:
-		__envcache[build][locale] = Environment(build, locale)
+class LazyFile(object):
+	"""
+	The file \a name of \a build, opened through get() the first time
+	it is used. Lets modules refer to files at import time without
+	opening them (and scanning the environment) until they are needed.
+	"""
 
-	return __envcache[build][locale].dbFile(name)
+	def __init__(self, name, build=-1, locale="enUS"):
+		self.name = name
+		self.build = build
+		self.locale = locale
+		self._file = None
+
+	def __repr__(self):
+		return "<%s %r (build %i, %s)>" % (self.__class__.__name__, self.name, self.build, self.locale)
+
+	def __contains__(self, id):
+		return id in self.resolve()
+
+	def __getattr__(self, attr):
+		return getattr(self.resolve(), attr)
+
+	def __getitem__(self, id):
+		return self.resolve()[id]
+
+	def __iter__(self):
+		return iter(self.resolve())
+
+	def __len__(self):
+		return len(self.resolve())
+
+	def resolve(self):
+		"""
+		Opens the file if needed and returns it
+		"""
+		if self._file is None:
+			self._file = get(self.name, build=self.build, locale=self.locale)
+		return self._file
+
+	def open(self, build=-1, locale="enUS"):
+		"""
+		Returns the file \a name of \a build and \a locale, which is
+		the resolved file when they are the ones of this LazyFile
+		"""
+		if (build, locale) == (self.build, self.locale):
+			return self.resolve()
+		return get(self.name, build=build, locale=locale)
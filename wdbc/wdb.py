@@ -14,15 +14,20 @@ Known wdb files and their signatures:
 """
 
 from collections import namedtuple
-from struct import pack, unpack, error as StructError
+from struct import Struct, pack, unpack, error as StructError
 from .log import log
-from .main import DBFile
+from .main import DBFile, DBRow
 from .structures import fields, getstructure
 from .utils import getfilename
 
 
 SEEK_CUR = 1 # os.SEEK_CUR
 
+STRING_CHUNK_SIZE = 256 # Read-ahead of _parse_string()
+
+# Column kinds of the row decoder, see WDBFile._decoder()
+VALUE, STRING, DATA, MASTER = range(4)
+
 class WDBFile(DBFile):
 	"""
 	A WDB file.
@@ -32,6 +37,8 @@ class WDBFile(DBFile):
 	- EOF is 8 NULL bytes (corresponding to id and reclen of 0).
 	"""
 
+	_decoderTable = None # Compiled row decoder, see _decoder()
+
 	MAGIC = {
 		"BDIW": "itemcache",
 		"BDNW": "itemnamecache",
@@ -81,56 +88,176 @@ class WDBFile(DBFile):
 			name = self.MAGIC[self.header.signature]
 		else: # allow for custom structures
 			name = getfilename(self.file.name)
-		self.structure = getstructure(name, self.build, parent=self)
+		self.structure = getstructure(name, self.build)
 		log.info("Using %s build %i" % (self.structure, self.build))
 		self.row_header_size = self.structure[0].size + 4
+		self._columnTable = None
+		self._decoderTable = None
+
+	def _columnLayout(self):
+		# Only structures without strings or dynamic columns have a fixed layout
+		ret = []
+		offset = 0
+		for field in self.structure:
+			if field.dyn or isinstance(field, (fields.StringField, fields.DataField, fields.DynamicMaster)):
+				return None
+			ret.append((offset, field.char))
+			offset += field.size
+		return ret
 
 	def _parse_row(self, id):
 		address, reclen = self._addresses[id]
-		self.file.seek(address)
-		data = self.file.read(reclen + self.row_header_size) # We also read id and reclen columns
-		row = self.parse_row(data, reclen) # assign to DBRow
+		size = reclen + self.row_header_size # We also read id and reclen columns
+		if self._columns() and self.structure._reclen() == size:
+			# Columns are decoded on first access
+			row = DBRow(self, record=self._view(address, size))
+		else:
+			data = self._read(address, size)
+			row = self.parse_row(data, reclen) # assign to DBRow
 		self._values[id] = row
+		return row
 
 	def _parse_string(self, data):
-		pos = data.tell()
-		try:
-			index = data.read().index("\x00")
-		except ValueError, e:
-			log.warning("Error parsing string: %s" % (e))
-			return ""
-		data.seek(pos)
-		return data.read(index + 1)[:-1].decode("ascii", "ignore")
-
-	def eof(self):
-		return "\0" * self.row_header_size
-
-	def data(self):
+		# Read ahead in chunks, then rewind to right after the \0
+		chunks = []
+		while True:
+			chunk = data.read(STRING_CHUNK_SIZE)
+			if not chunk:
+				log.warning("Error parsing string: no terminating null byte")
+				return ""
+			end = chunk.find("\0")
+			if end != -1:
+				chunks.append(chunk[:end])
+				data.seek(end + 1 - len(chunk), SEEK_CUR)
+				break
+			chunks.append(chunk)
+		return "".join(chunks).decode("ascii", "ignore")
+
+	def _decoder(self):
+		"""
+		Returns the row decoder of the structure, compiled once: one
+		(kind, field, Struct, master index) tuple per column.
+		"""
+		if self._decoderTable is None:
+			ret = []
+			names = self.structure.column_names
+			for field in self.structure:
+				if isinstance(field, fields.StringField):
+					ret.append((STRING, field, None, None))
+				elif isinstance(field, fields.DataField):
+					ret.append((DATA, field, None, names.index(field.master)))
+				elif isinstance(field, fields.DynamicMaster):
+					ret.append((MASTER, field, Struct("<I"), None))
+				else:
+					ret.append((VALUE, field, Struct("<%s" % (field.char)), None))
+			self._decoderTable = ret
+		return self._decoderTable
+
+	def _decode(self, data, reclen=0):
+		"""
+		Decodes the raw row \a data in a single pass, advancing an offset
+		within the buffer. Returns the list of the column values.
+		"""
+		values = []
+		append = values.append
+		size = len(data)
+		pos = 0
+		dynfields = 0 # Dynamic fields present in the row, set by its DynamicMaster
+		for kind, field, struct, master in self._decoder():
+			if field.dyn > dynfields:
+				append(None) # The column doesn't exist in this row
+				continue
+
+			if kind == STRING:
+				end = data.find("\0", pos)
+				if end == -1:
+					log.warning("Error parsing string: no terminating null byte")
+					append("")
+					pos = size
+				else:
+					append(data[pos:end].decode("ascii", "ignore"))
+					pos = end + 1
+
+			elif kind == DATA: # wowcache.wdb
+				length = values[master] or 0
+				append(data[pos:pos + length])
+				pos += length
+
+			else:
+				try:
+					value, = struct.unpack_from(data, pos)
+				except StructError:
+					log.warning("Field %s could not be parsed properly" % (field))
+					value = None
+				pos = min(pos + struct.size, size)
+				if kind == MASTER:
+					dynfields = value or 0
+				append(value)
+
+		if reclen:
+			real_reclen = reclen + self.row_header_size
+			if pos != real_reclen:
+				log.warning("Reclen not respected for row %r. Expected %i, read %i. (%+i)" % (values[0], real_reclen, pos, real_reclen-pos))
+
+		return values
+
+	def parse_row(self, data, reclen=0):
+		"""
+		Assign data to a DBRow instance
+		"""
+		return DBRow(self, columns=self._decode(data, reclen))
+
+	def _packers(self):
+		"""
+		Returns one (kind, Struct) pair per column, used by _write().
+		The Struct is None for columns not packed with one.
+		"""
 		ret = []
-		for row in self:
-			row = self[row]
-			row._save()
-			_data = []
-			reclen = None
+		for field in self.structure:
+			if isinstance(field, fields.RecLenField):
+				ret.append(("reclen", None))
+			elif isinstance(field, fields.StringField):
+				ret.append(("string", None))
+			elif isinstance(field, fields.DataField):
+				ret.append(("data", None))
+			else:
+				ret.append(("pack", Struct("<%s" % (field.char))))
+		return ret
 
-			for field, value in zip(self.structure, row):
+	def _write(self, f):
+		"""
+		Streams the header and the rows to \a f, followed by the
+		empty row marking the end of the file.
+		"""
+		packers = self._packers()
+		reclen = Struct("<I")
+		f.write(pack(self.headerStructure, *self.header))
+
+		for id in sorted(self):
+			row = self[id]
+			row._save()
+			head, body = [], None
+			data = head
+			for (kind, struct), value in zip(packers, row):
 				if value is None:
 					continue
-				elif isinstance(field, fields.RecLenField):
-					reclen = len(_data)
-					_data.append(0)
-				elif isinstance(field, fields.StringField):
-					_data.append(value.encode("utf-8") + "\x00")
-				elif isinstance(field, fields.StringField):
-					_data.append(pack("<I", value))
+				elif kind == "reclen":
+					# Everything after the reclen is counted in it
+					data = body = []
+				elif kind == "string":
+					data.append(value.encode("utf-8") + "\0")
+				elif kind == "data":
+					data.append(value)
 				else:
-					_data.append(pack("<%s" % (field.char), value))
+					data.append(struct.pack(value))
 
-			length = len("".join(_data[2:]))
-			_data[reclen] = pack("<I", length)
-			ret.append("".join(_data))
+			f.write("".join(head))
+			if body is not None:
+				body = "".join(body)
+				f.write(reclen.pack(len(body)))
+				f.write(body)
 
-		return "".join(ret)
+		f.write("\0" * self.row_header_size)
 
 	def preload(self):
 		f = self.file